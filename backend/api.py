@@ -3,79 +3,213 @@ Flask API主模块
 重构后的API接口，使用控制器进行业务逻辑处理
 """
 import os
+import decimal
+import gc
+import hashlib
+import io
 import logging
 import time
-from flask import Flask, request, send_from_directory, g
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+import orjson
+from flask import Flask, Request, Response, abort, request, send_from_directory, g
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from werkzeug.exceptions import RequestEntityTooLarge
-import uuid
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser, MultiPartParser
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.utils import secure_filename
 from functools import wraps
 
 from controllers import OCRController, AIAnalysisController, FileValidator, ResponseHelper
 from services import (
     FileProcessor, ValidationError, OCRError, FileProcessingError,
-    AIAnalysisError
+    AIAnalysisError, OCRResultCache, check_image_acceleration
 )
 from config import Config
+from logging_config import add_buffered_file_handler, configure_logging
 
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging(Config.LOG_LEVEL, Config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 api_logger = logging.getLogger('api_requests')
 performance_logger = logging.getLogger('performance')
 
-# Flask应用配置
-app = Flask(__name__)
-CORS(app)
+# 请求日志与性能日志写入带缓冲的文件，避免每条记录一次写盘
+if Config.LOG_DIR:
+    LOG_DIR = os.path.join(os.path.dirname(__file__), Config.LOG_DIR)
+    add_buffered_file_handler(api_logger, os.path.join(LOG_DIR, 'api.log'),
+                              Config.LOG_FORMAT, capacity=Config.LOG_BUFFER_CAPACITY,
+                              flush_interval=Config.LOG_FLUSH_INTERVAL)
+    add_buffered_file_handler(performance_logger, os.path.join(LOG_DIR, 'performance.log'),
+                              Config.LOG_FORMAT, capacity=Config.LOG_BUFFER_CAPACITY,
+                              flush_interval=Config.LOG_FLUSH_INTERVAL)
+
+# 上传读缓冲大小（Werkzeug默认64KB，大文件解析时CPU开销明显）
+UPLOAD_BUFFER_SIZE = 256 * 1024
+
+
+class UploadFormDataParser(FormDataParser):
+    """使用更大读缓冲的表单解析器"""
+
+    def _parse_multipart(self, stream, mimetype, content_length, options):
+        parser = MultiPartParser(
+            stream_factory=self.stream_factory,
+            max_form_memory_size=self.max_form_memory_size,
+            max_form_parts=self.max_form_parts,
+            cls=self.cls,
+            buffer_size=UPLOAD_BUFFER_SIZE,
+        )
+        boundary = options.get("boundary", "").encode("ascii")
+        if not boundary:
+            raise ValueError("Missing boundary")
+
+        form, files = parser.parse(stream, boundary, content_length)
+        return stream, form, files
+
+
+class UploadRequest(Request):
+    """自定义请求类"""
+    form_data_parser_class = UploadFormDataParser
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        """
+        上传文件的缓冲流：小请求保存在内存中，大请求直接写入上传目录下的临时文件，
+        保存时可通过硬链接落盘，无需再复制一次
+        """
+        if total_content_length is not None and total_content_length <= Config.UPLOAD_SPOOL_SIZE:
+            return io.BytesIO()
+        suffix = os.path.splitext(secure_filename(filename or ''))[1]
+        return tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix=suffix)
+
+
+def _orjson_default(obj):
+    """orjson不支持的类型转换"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """基于orjson的JSON序列化"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=_orjson_default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_orjson_default), mimetype='application/json'
+        )
+
+
+# Flask应用配置（静态文件由 serve_static 从前端目录提供，关闭Flask默认的static路由）
+app = Flask(__name__, static_folder=None)
+app.request_class = UploadRequest
+app.json = OrjsonProvider(app)
+# 部署在nginx之后，由中间件一次性还原客户端IP和协议
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)
+# 仅API需要跨域，预检结果由浏览器缓存
+CORS(app, resources={r"/api/*": {"origins": Config.CORS_ORIGINS}}, max_age=Config.CORS_MAX_AGE)
 
 # 应用配置
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
+FRONTEND_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = FileProcessor.MAX_FILE_SIZE
 
 # 请求日志装饰器
+LOG_PAYLOAD_MAX_BYTES = 32 * 1024  # 超过该大小的请求体不记录内容
+
+
 def log_request(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        g.start_time = time.time()
-        client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR'))
-        user_agent = request.headers.get('User-Agent', 'Unknown')
-        
-        api_logger.info(f"请求开始 - 方法: {request.method}, 路径: {request.path}, IP: {client_ip}, User-Agent: {user_agent}")
-
-        if request.is_json:  # 只有请求头 Content-Type: application/json 才会解析
-            api_logger.debug(f"请求参数 (JSON): {request.get_json()}")
-        if request.form:
-            form_data = dict(request.form)
-            api_logger.debug(f"请求参数 (Form): {form_data}")
-        if request.files:
-            file_info = {key: f"{file.filename} ({file.content_length} bytes)" for key, file in request.files.items()}
-            api_logger.debug(f"上传文件: {file_info}")
-            
+        # 日志级别只判断一次，未启用的日志不做任何准备工作
+        dbg = api_logger.isEnabledFor(logging.DEBUG)
+        perf = performance_logger.isEnabledFor(logging.INFO)
+        g.start_time = time.monotonic() if perf else 0.0
+
+        if api_logger.isEnabledFor(logging.INFO):
+            user_agent = request.headers.get('User-Agent', 'Unknown')
+            api_logger.info("请求开始 - 方法: %s, 路径: %s, IP: %s, User-Agent: %s",
+                            request.method, request.path, request.remote_addr, user_agent)
+
+        if dbg:
+            content_length = request.content_length
+            if content_length is not None and content_length <= LOG_PAYLOAD_MAX_BYTES:
+                if request.is_json:  # 只有请求头 Content-Type: application/json 才会解析
+                    api_logger.debug("请求参数 (JSON): %s", orjson.dumps(request.get_json()).decode())
+                if request.form:
+                    api_logger.debug("请求参数 (Form): %s", dict(request.form))
+            if request.files:
+                file_info = {key: f"{file.filename} ({file.content_length} bytes)" for key, file in request.files.items()}
+                api_logger.debug("上传文件: %s", file_info)
+
         try:
             response = f(*args, **kwargs)
-            duration = time.time() - g.start_time
-            performance_logger.info(f"请求完成 - 路径: {request.path}, 耗时: {duration:.3f}s, 状态: 成功")
+            if perf:
+                performance_logger.info("请求完成 - 路径: %s, 耗时: %.3fs, 状态: 成功",
+                                        request.path, time.monotonic() - g.start_time)
             return response
         except Exception as e:
-            duration = time.time() - g.start_time
-            api_logger.error(f"请求失败 - 路径: {request.path}, 耗时: {duration:.3f}s, 错误: {str(e)}")
+            if perf:
+                api_logger.error("请求失败 - 路径: %s, 耗时: %.3fs, 错误: %s",
+                                 request.path, time.monotonic() - g.start_time, e)
+            else:
+                api_logger.error("请求失败 - 路径: %s, 错误: %s", request.path, e)
             raise
     return decorated_function
 
+# 检查图像处理的SIMD加速条件
+check_image_acceleration()
+
 # 初始化控制器
 try:
-    ocr_controller = OCRController(UPLOAD_FOLDER)
+    ocr_result_cache = (
+        OCRResultCache(Config.OCR_CACHE_MAX_ENTRIES, Config.OCR_CACHE_TTL)
+        if Config.OCR_CACHE_MAX_ENTRIES > 0 else None
+    )
+    ocr_controller = OCRController(
+        UPLOAD_FOLDER, result_cache=ocr_result_cache, max_workers=Config.OCR_MAX_WORKERS,
+        pdf_render_workers=Config.PDF_RENDER_WORKERS, ocr_batch_pages=Config.OCR_BATCH_PAGES
+    )
+    # Dify调用使用 ai_analysis_service 模块级共享会话的连接池，避免每次分析重新建立TCP/TLS连接
     ai_analysis_controller = AIAnalysisController(Config.DIFY_MODELS)
     logger.info("所有控制器初始化成功")
 except Exception as e:
-    logger.error(f"控制器初始化失败: {e}")
+    logger.error("控制器初始化失败: %s", e)
     raise
 
+# 执行池：OCR为计算密集型，AI分析为I/O密集型，分开调度避免互相阻塞
+# CPU_POOL中的多个请求共用进程内同一OCR引擎，推理由OCRService的引擎锁串行执行
+CPU_POOL = ThreadPoolExecutor(max_workers=Config.OCR_MAX_WORKERS, thread_name_prefix='ocr')
+IO_POOL = ThreadPoolExecutor(max_workers=Config.AI_MAX_WORKERS, thread_name_prefix='ai')
+
+# 初始化完成后冻结已有对象（OCR模型、配置等常驻对象），之后的GC不再扫描它们；
+# 同时提高0代阈值，减少请求处理中频繁的小对象分配触发的回收
+gc.collect()
+gc.freeze()
+gc.set_threshold(50000, 50, 50)
+
+
+@app.before_request
+def reject_oversized_request():
+    """根据Content-Length提前拒绝超限请求，避免读取和解析请求体"""
+    content_length = request.content_length
+    if content_length and content_length > app.config['MAX_CONTENT_LENGTH']:
+        abort(413)
+
 
 # =============================================================================
 # 错误处理器
@@ -84,15 +218,38 @@ except Exception as e:
 @app.errorhandler(RequestEntityTooLarge)
 def handle_file_too_large(e):
     """处理文件过大异常"""
-    api_logger.warning(f"文件过大异常 - 路径: {request.path}, IP: {request.environ.get('REMOTE_ADDR')}")
+    api_logger.warning("文件过大异常 - 路径: %s, IP: %s", request.path, request.remote_addr)
     return ResponseHelper.error("文件大小超过限制", "FILE_TOO_LARGE", 413)
 
 
+@app.errorhandler(ValidationError)
+def handle_validation_error(e):
+    """处理数据验证异常"""
+    return ResponseHelper.error(str(e), "VALIDATION_ERROR", 400)
+
+
+@app.errorhandler(OCRError)
+@app.errorhandler(FileProcessingError)
+def handle_processing_error(e):
+    """处理文件处理和OCR识别异常"""
+    logger.exception("文件处理失败")
+    return ResponseHelper.error(f"文件处理失败: {e}", "PROCESSING_ERROR", 500)
+
+
+@app.errorhandler(AIAnalysisError)
+def handle_ai_analysis_error(e):
+    """处理AI分析异常"""
+    logger.exception("AI分析失败")
+    return ResponseHelper.error(f"AI分析失败: {e}", "AI_ANALYSIS_ERROR", 500)
+
+
 @app.errorhandler(Exception)
 def handle_general_exception(e):
     """处理通用异常"""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR'))
-    logger.error(f"未处理的异常 - 路径: {request.path}, IP: {client_ip}, 异常: {e}")
+    # 404、405等HTTP异常保持原有状态码
+    if isinstance(e, HTTPException):
+        return e
+    logger.exception("未处理的异常 - 路径: %s, IP: %s", request.path, request.remote_addr)
     return ResponseHelper.error("服务器内部错误", "INTERNAL_ERROR", 500)
 
 
@@ -103,19 +260,19 @@ def handle_general_exception(e):
 @app.route('/', methods=['GET'])
 def index():
     """主页路由"""
-    return send_from_directory('../frontend', 'index.html')
+    return send_from_directory(FRONTEND_DIR, 'index.html', conditional=True)
 
 
 @app.route('/analysis')
 def analysis_page():
     """AI分析页面路由"""
-    return send_from_directory('../frontend', 'analysis.html')
+    return send_from_directory(FRONTEND_DIR, 'analysis.html', conditional=True)
 
 
 @app.route('/static/<path:filename>')
 def serve_static(filename: str):
     """静态文件服务"""
-    return send_from_directory('../frontend', filename)
+    return send_from_directory(FRONTEND_DIR, filename, conditional=True, max_age=Config.STATIC_MAX_AGE)
 
 
 # =============================================================================
@@ -128,13 +285,10 @@ def health_check():
     """健康检查接口"""
     try:
         health_data = ocr_controller.get_health_info()
-        return ResponseHelper.success(health_data)
-    except OCRError as e:
-        logger.error(f"健康检查失败: {e}")
+    except OCRError:
+        logger.exception("健康检查失败")
         return ResponseHelper.error("服务不健康", "HEALTH_CHECK_FAILED", 503)
-    except Exception as e:
-        logger.error(f"健康检查异常: {e}")
-        return ResponseHelper.error("健康检查失败", "HEALTH_CHECK_ERROR", 500)
+    return ResponseHelper.success(health_data)
 
 
 @app.route('/api/upload', methods=['POST'])
@@ -146,31 +300,53 @@ def upload_and_process():
     Returns:
         包含处理结果的JSON响应
     """
+    # 验证请求
+    is_valid, error_msg = FileValidator.validate_upload_request(request)
+    if not is_valid:
+        return ResponseHelper.error(error_msg, "INVALID_REQUEST")
+    
+    # 处理文件（保存时由 FileManager 生成唯一文件名）
+    file = request.files['file']
+    result_data = CPU_POOL.submit(ocr_controller.process_single_file, file).result()
+    return ResponseHelper.success(result_data, "文档识别完成")
+
+
+@app.route('/api/upload-stream', methods=['POST'])
+@log_request
+def upload_stream_and_process():
+    """
+    流式文件上传和OCR处理接口
+    请求体为文件原始内容，文件名通过查询参数 filename 或请求头 X-Filename（URL编码）传递，
+    跳过multipart解析直接写入磁盘
+    
+    Returns:
+        包含处理结果的JSON响应
+    """
+    filename = request.args.get('filename') or unquote(request.headers.get('X-Filename', ''))
+    if not filename:
+        return ResponseHelper.error("缺少文件名", "INVALID_REQUEST")
+    
+    # 写盘前先根据文件名和Content-Length拒绝不合法的上传
+    safe_filename = secure_filename(filename)
+    is_valid, error_msg, _ = FileValidator.validate_filename(safe_filename)
+    if not is_valid:
+        raise ValidationError(error_msg)
+    if request.content_length == 0:
+        raise ValidationError("文件为空")
+    
+    # 直接将请求体写入上传目录
+    suffix = os.path.splitext(safe_filename)[1]
+    tmp = tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix=suffix, delete=False)
     try:
-        # 验证请求
-        is_valid, error_msg = FileValidator.validate_upload_request(request)
-        if not is_valid:
-            return ResponseHelper.error(error_msg, "INVALID_REQUEST")
-        
-        file = request.files['file']
-
-        # 生成唯一ID
-        unique_id = str(uuid.uuid4())
-
-        # 修改文件名：uuid + 原始文件名
-        file.filename = f"{unique_id}_{file.filename}"
-        # 处理文件
-        result_data = ocr_controller.process_single_file(file)
-        return ResponseHelper.success(result_data, "文档识别完成")
-        
-    except ValidationError as e:
-        return ResponseHelper.error(str(e), "VALIDATION_ERROR", 400)
-    except (OCRError, FileProcessingError) as e:
-        logger.error(f"文件处理失败: {e}")
-        return ResponseHelper.error(f"文件处理失败: {str(e)}", "PROCESSING_ERROR", 500)
-    except Exception as e:
-        logger.error(f"上传处理异常: {e}")
-        return ResponseHelper.error("上传处理失败", "UPLOAD_ERROR", 500)
+        with tmp:
+            shutil.copyfileobj(request.stream, tmp, UPLOAD_BUFFER_SIZE)
+    except Exception:
+        ocr_controller.file_manager.cleanup_file(tmp.name)
+        raise
+    
+    # 处理文件（处理完成后由控制器清理）
+    result_data = CPU_POOL.submit(ocr_controller.process_path, tmp.name, filename).result()
+    return ResponseHelper.success(result_data, "文档识别完成")
 
 
 @app.route('/api/batch-upload', methods=['POST'])
@@ -182,30 +358,28 @@ def batch_upload_and_process():
     Returns:
         包含批量处理结果的JSON响应
     """
-    try:
-        if 'files' not in request.files:
-            return ResponseHelper.error("没有选择文件", "NO_FILES")
-        
-        files = request.files.getlist('files')
-        if not files:
-            return ResponseHelper.error("文件列表为空", "EMPTY_FILES")
-        
-        # 批量处理文件
-        batch_result = ocr_controller.process_batch_files(files)
-        
-        success_count = batch_result['summary']['success']
-        total_count = batch_result['summary']['total']
-        
-        return ResponseHelper.success(
-            batch_result, 
-            f"批量处理完成: {success_count}/{total_count} 成功"
-        )
-        
-    except ValidationError as e:
-        return ResponseHelper.error(str(e), "VALIDATION_ERROR", 400)
-    except Exception as e:
-        logger.error(f"批量上传处理异常: {e}")
-        return ResponseHelper.error("批量处理失败", "BATCH_ERROR", 500)
+    if 'files' not in request.files:
+        return ResponseHelper.error("没有选择文件", "NO_FILES")
+    
+    files = request.files.getlist('files')
+    if not files:
+        return ResponseHelper.error("文件列表为空", "EMPTY_FILES")
+    
+    # 批量处理文件
+    batch_result = ocr_controller.process_batch_files(files)
+    
+    success_count = batch_result['summary']['success']
+    total_count = batch_result['summary']['total']
+    
+    return ResponseHelper.success(
+        batch_result, 
+        f"批量处理完成: {success_count}/{total_count} 成功"
+    )
+
+
+# 分析类型只取决于配置，启动时预先序列化并计算ETag
+_ANALYSIS_TYPES_BODY = orjson.dumps(ResponseHelper.success(list(Config.DIFY_TYPES_LIST), "获取分析类型成功"))
+_ANALYSIS_TYPES_ETAG = hashlib.blake2b(_ANALYSIS_TYPES_BODY, digest_size=16).hexdigest()
 
 
 @app.route('/api/analysis-types', methods=['GET'])
@@ -215,23 +389,11 @@ def get_analysis_types():
     获取可用的分析类型接口
     
     Returns:
-        包含分析类型列表的JSON响应
+        包含分析类型列表的JSON响应；If-None-Match与ETag一致时返回304
     """
-    try:
-        # 从配置中获取分析类型
-        analysis_types = []
-        for model_id, model_config in Config.DIFY_MODELS.items():
-            analysis_types.append({
-                'id': model_config['id'],
-                'name': model_config['name'],
-                'description': model_config['description']
-            })
-        
-        return ResponseHelper.success(analysis_types, "获取分析类型成功")
-        
-    except Exception as e:
-        logger.error(f"获取分析类型异常: {e}")
-        return ResponseHelper.error("获取分析类型失败", "GET_TYPES_ERROR", 500)
+    response = Response(_ANALYSIS_TYPES_BODY, mimetype='application/json')
+    response.set_etag(_ANALYSIS_TYPES_ETAG)
+    return response.make_conditional(request)
 
 
 @app.route('/api/ai-analysis', methods=['POST'])
@@ -243,33 +405,29 @@ def ai_analysis():
     Returns:
         包含AI分析结果的JSON响应
     """
-    try:
-        # 验证请求数据
-        if not request.json:
-            return ResponseHelper.error("请求数据格式错误", "INVALID_JSON")
-        
-        content = request.json.get('content', '').strip()
-        analysis_type = request.json.get('analysis_type', 'general')
-        
-        # 执行AI分析
-        analysis_result = ai_analysis_controller.analyze_content(content, analysis_type)
-        
-        return ResponseHelper.success(analysis_result, "AI分析完成")
-        
-    except ValidationError as e:
-        return ResponseHelper.error(str(e), "VALIDATION_ERROR", 400)
-    except AIAnalysisError as e:
-        logger.error(f"AI分析失败: {e}")
-        return ResponseHelper.error(f"AI分析失败: {str(e)}", "AI_ANALYSIS_ERROR", 500)
-    except Exception as e:
-        logger.error(f"AI分析接口异常: {e}")
-        return ResponseHelper.error("AI分析服务暂时不可用", "AI_SERVICE_ERROR", 500)
+    # 验证请求数据
+    data = request.get_json(silent=True)
+    if not data:
+        return ResponseHelper.error("请求数据格式错误", "INVALID_JSON")
+    
+    content = data.get('content', '')
+    analysis_type = data.get('analysis_type', 'general')
+    if not isinstance(analysis_type, str) or analysis_type not in Config.DIFY_MODEL_IDS:
+        raise ValidationError(f"不支持的分析类型: {analysis_type}")
+    
+    # 执行AI分析
+    analysis_result = IO_POOL.submit(
+        ai_analysis_controller.analyze_content, content, analysis_type
+    ).result()
+    
+    return ResponseHelper.success(analysis_result, "AI分析完成")
 
 
 # =============================================================================
 # 应用启动
 # =============================================================================
 
+# 生产环境通过 gunicorn 启动: gunicorn -c gunicorn.conf.py api:app
 if __name__ == '__main__':
-    logger.info("启动Flask应用")
-    app.run(debug=True, host='0.0.0.0', port=20010, threaded=False)
\ No newline at end of file
+    logger.info("启动Flask开发服务器")
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=20010, threaded=True)
\ No newline at end of file
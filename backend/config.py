@@ -2,43 +2,87 @@
 应用配置模块
 """
 import os
-from typing import Dict, Any
+from typing import Any, Callable, Dict
 from pathlib import Path
 
 
+def _as_bool(value: str) -> bool:
+    """将环境变量字符串转换为布尔值"""
+    return value.lower() == 'true'
+
+
+def _env(key: str, default: Any = None, cast: Callable[[str], Any] = str) -> Any:
+    """
+    读取环境变量并转换类型
+
+    Args:
+        key: 环境变量名
+        default: 未设置时的默认值（不做类型转换）
+        cast: 类型转换函数
+
+    Returns:
+        转换后的值或默认值
+
+    Raises:
+        ValueError: 环境变量的值无法转换为目标类型，错误信息中包含变量名
+    """
+    value = os.environ.get(key)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError as e:
+        raise ValueError(f"环境变量 {key}={value!r} 无效: {e}") from None
+
+
 class Config:
     """基础配置类"""
     
     # 应用基础配置
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
+    SECRET_KEY = _env('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    DEBUG = _env('FLASK_DEBUG', True, _as_bool)
     
     # 服务器配置
-    HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
-    PORT = int(os.environ.get('FLASK_PORT', 5000))
+    HOST = _env('FLASK_HOST', '0.0.0.0')
+    PORT = _env('FLASK_PORT', 5000, int)
     
     # 文件上传配置
-    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
-    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
-    ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'bmp', 'tiff'}
+    UPLOAD_FOLDER = _env('UPLOAD_FOLDER', 'uploads')
+    MAX_CONTENT_LENGTH = _env('MAX_CONTENT_LENGTH', 16 * 1024 * 1024, int)  # 16MB
+    ALLOWED_EXTENSIONS = frozenset({'pdf', 'png', 'jpg', 'jpeg', 'bmp', 'tiff'})
+    UPLOAD_SPOOL_SIZE = _env('UPLOAD_SPOOL_SIZE', 8 * 1024 * 1024, int)  # 不超过该大小的上传保留在内存中
     
     # OCR配置
-    OCR_LANGUAGE = os.environ.get('OCR_LANGUAGE', 'ch')
-    OCR_USE_ANGLE_CLS = os.environ.get('OCR_USE_ANGLE_CLS', 'true').lower() == 'true'
-    OCR_MAX_WORKERS = int(os.environ.get('OCR_MAX_WORKERS', 4))
+    OCR_LANGUAGE = _env('OCR_LANGUAGE', 'ch')
+    OCR_USE_ANGLE_CLS = _env('OCR_USE_ANGLE_CLS', True, _as_bool)
+    OCR_MAX_WORKERS = _env('OCR_MAX_WORKERS', 4, int)
+    OCR_BATCH_PAGES = _env('OCR_BATCH_PAGES', 8, int)  # PDF批量识别每批页数
+    OCR_CACHE_MAX_ENTRIES = _env('OCR_CACHE_MAX_ENTRIES', 256, int)  # 0表示关闭结果缓存
+    OCR_CACHE_TTL = _env('OCR_CACHE_TTL', 86400, int)  # 秒
+    
+    # AI分析配置
+    AI_MAX_WORKERS = _env('AI_MAX_WORKERS', 32, int)
     
     # 图片处理配置
     IMAGE_MAX_SIZE = (2048, 2048)  # 最大图片尺寸
     THUMBNAIL_SIZE = (300, 300)    # 缩略图尺寸
-    PDF_DPI = int(os.environ.get('PDF_DPI', 200))  # PDF转图片DPI
-    PREVIEW_DPI = int(os.environ.get('PREVIEW_DPI', 150))  # 预览图DPI
+    PDF_DPI = _env('PDF_DPI', 200, int)  # PDF转图片DPI
+    PREVIEW_DPI = _env('PREVIEW_DPI', 150, int)  # 预览图DPI
+    PDF_RENDER_WORKERS = _env('PDF_RENDER_WORKERS', 0, int)  # PDF并行渲染进程数，0表示顺序渲染
+    
+    # 静态文件配置
+    STATIC_MAX_AGE = _env('STATIC_MAX_AGE', 86400, int)  # 浏览器缓存时间（秒）
     
     # 日志配置
-    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVEL = _env('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LOG_DIR = _env('LOG_DIR', 'logs')  # 请求/性能日志目录，相对backend目录；为空时输出到控制台
+    LOG_BUFFER_CAPACITY = _env('LOG_BUFFER_CAPACITY', 128, int)  # 日志内存缓冲条数
+    LOG_FLUSH_INTERVAL = _env('LOG_FLUSH_INTERVAL', 2.0, float)  # 缓冲日志最长刷新间隔（秒）
     
     # CORS配置
-    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
+    CORS_ORIGINS = _env('CORS_ORIGINS', '*').split(',')
+    CORS_MAX_AGE = _env('CORS_MAX_AGE', 86400, int)  # 预检请求缓存时间（秒）
     
     # Dify AI配置
     DIFY_MODELS = {
@@ -46,32 +90,39 @@ class Config:
             'id': 'general',
             'name': '通用分析',
             'description': '对文本内容进行全面的分析和理解',
-            'url': os.environ.get('DIFY_GENERAL_URL', 'https://api.dify.ai/v1/workflows/run'),
-            'token': os.environ.get('DIFY_GENERAL_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
+            'url': _env('DIFY_GENERAL_URL', 'https://api.dify.ai/v1/workflows/run'),
+            'token': _env('DIFY_GENERAL_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
         },
         'summary': {
             'id': 'summary',
             'name': '内容摘要',
             'description': '提取文本的核心内容和关键信息',
-            'url': os.environ.get('DIFY_SUMMARY_URL', 'https://api.dify.ai/v1/workflows/run'),
-            'token': os.environ.get('DIFY_SUMMARY_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
+            'url': _env('DIFY_SUMMARY_URL', 'https://api.dify.ai/v1/workflows/run'),
+            'token': _env('DIFY_SUMMARY_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
         },
         'extract': {
             'id': 'extract',
             'name': '信息提取',
             'description': '从文本中提取特定的数据和实体',
-            'url': os.environ.get('DIFY_EXTRACT_URL', 'https://api.dify.ai/v1/workflows/run'),
-            'token': os.environ.get('DIFY_EXTRACT_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
+            'url': _env('DIFY_EXTRACT_URL', 'https://api.dify.ai/v1/workflows/run'),
+            'token': _env('DIFY_EXTRACT_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
         },
         'sentiment': {
             'id': 'sentiment',
             'name': '情感分析',
             'description': '分析文本的情感倾向和态度',
-            'url': os.environ.get('DIFY_SENTIMENT_URL', 'https://api.dify.ai/v1/workflows/run'),
-            'token': os.environ.get('DIFY_SENTIMENT_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
+            'url': _env('DIFY_SENTIMENT_URL', 'https://api.dify.ai/v1/workflows/run'),
+            'token': _env('DIFY_SENTIMENT_TOKEN', 'app-dAUUqBRS185OrvicXgikgb8K')
         }
     }
     
+    # 由DIFY_MODELS派生，类加载时计算一次
+    DIFY_MODEL_IDS = frozenset(DIFY_MODELS)
+    DIFY_TYPES_LIST = tuple(
+        {'id': m['id'], 'name': m['name'], 'description': m['description']}
+        for m in DIFY_MODELS.values()
+    )
+    
     @classmethod
     def init_app(cls, app) -> None:
         """初始化Flask应用配置"""
@@ -109,7 +160,7 @@ class ProductionConfig(Config):
     LOG_LEVEL = 'WARNING'
     
     # 生产环境安全配置
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-must-set-secret-key-in-production'
+    SECRET_KEY = _env('SECRET_KEY') or 'you-must-set-secret-key-in-production'
     
     @classmethod
     def init_app(cls, app) -> None:
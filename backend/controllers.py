@@ -2,17 +2,19 @@
 业务逻辑控制器
 处理OCR文档扫描相关的业务逻辑
 """
-import gc
+import io
 import logging
-import traceback
-from typing import Dict, Any, Tuple, List
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Any, Tuple, List, Optional
 from werkzeug.utils import secure_filename
 
 from services import (
-    OCRService, PDFProcessor, ImageProcessor, PreviewGenerator,
+    get_ocr_service, PDFProcessor, ImageProcessor, PreviewGenerator,
     FileManager, FileProcessor, OCRError, FileProcessingError,
     UnsupportedFileError, FileSizeError, ValidationError,
-    AIAnalysisService, AIAnalysisError
+    AIAnalysisService, AIAnalysisError, OCRResultCache, open_pdf
 )
 
 logger = logging.getLogger(__name__)
@@ -35,20 +37,53 @@ class FileValidator:
         return True, ""
     
     @staticmethod
-    def validate_file(file) -> Tuple[bool, str]:
-        """验证文件"""
+    def validate_file(file) -> Tuple[bool, str, str, str]:
+        """验证文件，返回 (是否有效, 错误信息, 文件类型, 安全文件名)"""
         if not file:
-            return False, "文件为空"
+            return False, "文件为空", "", ""
         
         filename = secure_filename(file.filename)
-        if not FileProcessor.is_allowed_file(filename):
-            return False, f"不支持的文件格式，支持的格式: {', '.join(FileProcessor.ALLOWED_EXTENSIONS)}"
+        is_valid, error_msg, file_type = FileValidator.validate_filename(filename)
+        if not is_valid:
+            return False, error_msg, file_type, filename
+        
+        is_valid, error_msg = FileValidator.validate_size(FileValidator.get_file_size(file))
+        return is_valid, error_msg, file_type, filename
+    
+    @staticmethod
+    def get_file_size(file) -> int:
+        """
+        获取上传文件大小，内存缓冲直接读取长度，其他流通过seek到末尾测量
+        
+        Args:
+            file: 上传的文件对象（FileStorage）
+            
+        Returns:
+            文件大小（字节）
+        """
+        stream = file.stream
+        # 小文件由Werkzeug缓存在BytesIO中
+        if isinstance(stream, io.BytesIO):
+            return stream.getbuffer().nbytes
         
-        # 文件大小检查
-        file.seek(0, 2)  # 移到文件末尾
-        file_size = file.tell()
-        file.seek(0)  # 重置文件指针
+        # 已落盘的临时文件等其他流：seek到末尾取位置后恢复原位置，不依赖流的内部实现
+        position = stream.tell()
+        file_size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return file_size
+    
+    @staticmethod
+    def validate_filename(filename: str) -> Tuple[bool, str, str]:
+        """验证文件名（扩展名），返回 (是否有效, 错误信息, 文件类型)"""
+        file_type = FileProcessor.extension_of(filename)
+        if file_type not in FileProcessor.ALLOWED_EXTENSIONS:
+            return False, f"不支持的文件格式，支持的格式: {FileProcessor.ALLOWED_EXTENSIONS_DISPLAY}", file_type
         
+        return True, "", file_type
+    
+    @staticmethod
+    def validate_size(file_size: int) -> Tuple[bool, str]:
+        """验证文件大小"""
         if not FileProcessor.validate_file_size(file_size):
             return False, f"文件大小超过限制 ({FileProcessor.MAX_FILE_SIZE // (1024*1024)}MB)"
         
@@ -58,16 +93,25 @@ class FileValidator:
 class OCRController:
     """OCR业务逻辑控制器"""
     
-    def __init__(self, upload_folder: str):
+    def __init__(self, upload_folder: str, result_cache: Optional[OCRResultCache] = None,
+                 max_workers: int = 4, pdf_render_workers: int = 0, ocr_batch_pages: int = 8):
         """
         初始化OCR控制器
         
         Args:
             upload_folder: 上传文件目录
+            result_cache: OCR结果缓存，为None时不缓存
+            max_workers: 批量处理时的最大并发数
+            pdf_render_workers: PDF并行渲染进程数，0表示顺序渲染
+            ocr_batch_pages: PDF批量识别每批页数
         """
         self.upload_folder = upload_folder
-        self.ocr_service = OCRService(lang='ch', use_angle_cls=True)
-        self.pdf_processor = PDFProcessor()
+        self.result_cache = result_cache
+        self.max_workers = max_workers
+        self.ocr_batch_pages = ocr_batch_pages
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr-batch')
+        self.ocr_service = get_ocr_service(lang='ch', use_angle_cls=True)
+        self.pdf_processor = PDFProcessor(render_workers=pdf_render_workers)
         self.image_processor = ImageProcessor()
         self.preview_generator = PreviewGenerator()
         self.file_manager = FileManager(upload_folder)
@@ -91,7 +135,7 @@ class OCRController:
                 }
             }
         except Exception as e:
-            logger.error(f"健康检查失败: {e}")
+            logger.error("健康检查失败: %s", e)
             raise OCRError(f"服务不健康: {e}")
     
     def process_single_file(self, file) -> Dict[str, Any]:
@@ -110,45 +154,90 @@ class OCRController:
             OCRError: OCR识别失败
         """
         # 验证请求和文件
-        is_valid, error_msg = FileValidator.validate_file(file)
+        is_valid, error_msg, file_type, original_filename = FileValidator.validate_file(file)
         if not is_valid:
             raise ValidationError(error_msg)
         
         # 保存文件
-        original_filename = secure_filename(file.filename)
         file_path, unique_filename = self.file_manager.save_uploaded_file(file, original_filename)
         
-        try:
-            # 获取文件类型
-            file_type = FileProcessor.get_file_extension(original_filename)
+        # 处理结束后清理上传的文件
+        with self.file_manager.cleanup_on_exit(file_path):
+            return self._build_file_result(file_path, unique_filename, original_filename, file_type)
+    
+    def process_path(self, file_path: str, filename: str) -> Dict[str, Any]:
+        """
+        处理已写入磁盘的上传文件（流式上传）
+        
+        Args:
+            file_path: 已保存的文件路径，处理结束后会被清理
+            filename: 客户端提供的原始文件名
             
-            # 处理文件并执行OCR
-            extracted_text = self._process_file_ocr(file_path, file_type)
+        Returns:
+            处理结果数据
             
-            # 生成预览
-            preview_data = self.preview_generator.generate_preview(file_path, file_type)
+        Raises:
+            ValidationError: 验证失败
+            FileProcessingError: 文件处理失败
+            OCRError: OCR识别失败
+        """
+        with self.file_manager.cleanup_on_exit(file_path):
+            original_filename = secure_filename(filename)
+            is_valid, error_msg, file_type = FileValidator.validate_filename(original_filename)
+            if not is_valid:
+                raise ValidationError(error_msg)
             
-            # 构造响应数据
-            result_data = {
-                'filename': unique_filename,
-                'original_filename': original_filename,
-                'text': extracted_text,
-                'preview': preview_data,
-                'file_type': file_type,
-                'text_length': len(extracted_text),
-                'has_text': bool(extracted_text.strip())
-            }
+            file_size = os.path.getsize(file_path)
+            if file_size == 0:
+                raise ValidationError("文件为空")
+            is_valid, error_msg = FileValidator.validate_size(file_size)
+            if not is_valid:
+                raise ValidationError(error_msg)
+            
+            return self._build_file_result(
+                file_path, os.path.basename(file_path), original_filename, file_type
+            )
+    
+    def _build_file_result(self, file_path: str, unique_filename: str, original_filename: str,
+                           file_type: str) -> Dict[str, Any]:
+        """
+        对已保存的文件执行OCR并生成预览
+        
+        Args:
+            file_path: 文件路径
+            unique_filename: 保存时使用的唯一文件名
+            original_filename: 原始文件名
+            file_type: 验证时得到的文件类型（小写扩展名）
             
-            logger.info(f"文件处理完成: {original_filename}")
-            return result_data
+        Returns:
+            处理结果数据
+        """
+        # PDF在识别与生成预览之间只打开一次
+        with open_pdf(file_path) if file_type == 'pdf' else nullcontext() as pdf_doc:
+            # 处理文件并执行OCR
+            extracted_text = self._recognize(file_path, file_type, pdf_doc)
             
-        finally:
-            # 清理上传的文件
-            self.file_manager.cleanup_file(file_path)
+            # 生成预览
+            preview_data = self.preview_generator.generate_preview(file_path, file_type, pdf_doc)
+        
+        # 构造响应数据
+        result_data = {
+            'filename': unique_filename,
+            'original_filename': original_filename,
+            'text': extracted_text,
+            'preview': preview_data,
+            'file_type': file_type,
+            'text_length': len(extracted_text),
+            'has_text': bool(extracted_text.strip())
+        }
+        
+        logger.info("文件处理完成: %s", original_filename)
+        return result_data
     
     def process_batch_files(self, files) -> Dict[str, Any]:
         """
         批量处理文件上传和OCR识别
+        按阶段处理：先验证全部文件，再并发保存、并发识别，最后统一清理
         
         Args:
             files: 文件列表
@@ -159,46 +248,60 @@ class OCRController:
         if not files:
             raise ValidationError("文件列表为空")
         
-        results = []
-        for i, file in enumerate(files):
+        results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        
+        # 验证全部文件
+        valid_entries = []
+        for index, file in enumerate(files):
             try:
-                # 验证文件
-                is_valid, error_msg = FileValidator.validate_file(file)
-                if not is_valid:
-                    results.append({
-                        'index': i,
-                        'filename': file.filename,
-                        'success': False,
-                        'error': error_msg
-                    })
-                    continue
-                
-                # 处理单个文件
-                original_filename = secure_filename(file.filename)
-                file_path, unique_filename = self.file_manager.save_uploaded_file(file, original_filename)
-                
-                try:
-                    file_type = FileProcessor.get_file_extension(original_filename)
-                    extracted_text = self._process_file_ocr(file_path, file_type)
-                    
-                    results.append({
-                        'index': i,
-                        'filename': original_filename,
-                        'success': True,
-                        'text': extracted_text,
-                        'text_length': len(extracted_text),
-                        'has_text': bool(extracted_text.strip())
-                    })
-                finally:
-                    self.file_manager.cleanup_file(file_path)
-                    
+                is_valid, error_msg, file_type, original_filename = FileValidator.validate_file(file)
+            except Exception as e:
+                is_valid, error_msg = False, str(e)
+            if is_valid:
+                valid_entries.append((index, file, file_type, original_filename))
+            else:
+                results[index] = self._batch_error(index, file, error_msg)
+        
+        # 并发保存通过验证的文件
+        save_futures = [
+            (index, file, file_type, original_filename,
+             self._executor.submit(self.file_manager.save_uploaded_file, file, original_filename))
+            for index, file, file_type, original_filename in valid_entries
+        ]
+        saved_entries = []
+        for index, file, file_type, original_filename, future in save_futures:
+            try:
+                file_path, _ = future.result()
             except Exception as e:
-                results.append({
-                    'index': i,
-                    'filename': file.filename if file else f'file_{i}',
-                    'success': False,
-                    'error': str(e)
-                })
+                results[index] = self._batch_error(index, file, str(e))
+                continue
+            saved_entries.append((index, original_filename, file_type, file_path))
+        
+        try:
+            # 并发执行OCR识别：读盘、哈希、预处理可重叠，
+            # PDF渲染与引擎推理分别由MuPDF锁和引擎锁串行化
+            ocr_futures = [
+                (index, original_filename, self._executor.submit(self._recognize, file_path, file_type))
+                for index, original_filename, file_type, file_path in saved_entries
+            ]
+            for index, original_filename, future in ocr_futures:
+                try:
+                    extracted_text = future.result()
+                except Exception as e:
+                    results[index] = self._batch_error(index, original_filename, str(e))
+                    continue
+                results[index] = {
+                    'index': index,
+                    'filename': original_filename,
+                    'success': True,
+                    'text': extracted_text,
+                    'text_length': len(extracted_text),
+                    'has_text': bool(extracted_text.strip())
+                }
+        finally:
+            # 统一清理已保存的文件
+            for _, _, _, file_path in saved_entries:
+                self.file_manager.cleanup_file(file_path)
         
         # 统计结果
         success_count = sum(1 for r in results if r['success'])
@@ -213,13 +316,63 @@ class OCRController:
             }
         }
     
-    def _process_file_ocr(self, file_path: str, file_type: str) -> str:
+    @staticmethod
+    def _batch_error(index: int, file, error: str) -> Dict[str, Any]:
+        """
+        构造批量处理中单个文件的失败结果
+        
+        Args:
+            index: 文件在批量请求中的序号
+            file: 上传的文件对象或文件名
+            error: 错误信息
+            
+        Returns:
+            单个文件的失败结果
+        """
+        if isinstance(file, str):
+            filename = file
+        else:
+            filename = file.filename if file else f'file_{index}'
+        return {
+            'index': index,
+            'filename': filename,
+            'success': False,
+            'error': error
+        }
+    
+    def _recognize(self, file_path: str, file_type: str, pdf_doc=None) -> str:
+        """
+        执行OCR识别，相同内容的文件直接返回缓存结果
+        
+        Args:
+            file_path: 文件路径
+            file_type: 文件类型
+            pdf_doc: 已打开的PDF文档（fitz.Document），为None时按路径打开
+            
+        Returns:
+            识别的文本内容
+        """
+        if self.result_cache is None:
+            return self._process_file_ocr(file_path, file_type, pdf_doc)
+        
+        cache_key = f"{file_type}:{OCRResultCache.hash_file(file_path)}"
+        cached_text = self.result_cache.get(cache_key)
+        if cached_text is not None:
+            logger.info("OCR缓存命中: %s", cache_key)
+            return cached_text
+        
+        extracted_text = self._process_file_ocr(file_path, file_type, pdf_doc)
+        self.result_cache.set(cache_key, extracted_text)
+        return extracted_text
+    
+    def _process_file_ocr(self, file_path: str, file_type: str, pdf_doc=None) -> str:
         """
         处理文件OCR识别
         
         Args:
             file_path: 文件路径
             file_type: 文件类型
+            pdf_doc: 已打开的PDF文档（fitz.Document），为None时按路径打开
             
         Returns:
             识别的文本内容
@@ -228,56 +381,46 @@ class OCRController:
             OCRError: OCR处理失败
             FileProcessingError: 文件处理失败
         """
-        logger.info(f"文件执行OCR: {file_path}")
+        logger.info("文件执行OCR: %s", file_path)
         try:
             if file_type == 'pdf':
                 # 处理PDF文件
-                images_data = self.pdf_processor.convert_to_images(file_path)
+                images_data = self.pdf_processor.convert_to_images(file_path if pdf_doc is None else pdf_doc)
                 if not images_data:
                     raise FileProcessingError("PDF文件转换失败，没有生成图片")
                 
-                # 批量OCR识别
-                texts = self.ocr_service.recognize_multiple_images(images_data)
-                
-                # 清理内存
-                gc.collect()
+                # 分批OCR识别
+                texts = self.ocr_service.recognize_multiple_images(images_data, self.ocr_batch_pages)
                 
                 # 组合结果
-                extracted_text = ""
-                for i, text in enumerate(texts):
-                    if text.strip():
-                        extracted_text += f"第{i+1}页:\n{text}\n\n"
-                
-                return extracted_text.strip()
+                parts = [f"第{i+1}页:\n{text}" for i, text in enumerate(texts) if text.strip()]
+                return "\n\n".join(parts).strip()
             else:
                 # 处理图片文件
                 if not self.image_processor.validate_image(file_path):
                     raise FileProcessingError("图片文件无效或损坏")
                 
-                result = self.ocr_service.recognize_image(file_path)
-                
-                # 清理内存
-                gc.collect()
-                
-                return result
+                return self.ocr_service.recognize_image(file_path)
         
         except (OCRError, FileProcessingError):
             raise
         except Exception as e:
-            raise OCRError(f"OCR处理过程中发生未知错误: {e}\n{traceback.format_exc()}")
+            logger.exception("OCR处理未知错误: %s", file_path)
+            raise OCRError(f"OCR处理过程中发生未知错误: {e}") from e
 
 
 class AIAnalysisController:
     """AI分析业务逻辑控制器"""
     
-    def __init__(self, dify_models_config: Dict[str, Dict[str, str]] = None):
+    def __init__(self, dify_models_config: Dict[str, Dict[str, str]] = None, session=None):
         """
         初始化AI分析控制器
         
         Args:
             dify_models_config: Dify模型配置
+            session: 调用Dify使用的HTTP会话（requests.Session）
         """
-        self.ai_analysis_service = AIAnalysisService(dify_models_config)
+        self.ai_analysis_service = AIAnalysisService(dify_models_config, session=session)
         logger.info("AI分析控制器初始化成功")
     
     def analyze_content(self, content: str, analysis_type: str = 'general') -> Dict[str, Any]:
@@ -285,7 +428,7 @@ class AIAnalysisController:
         分析内容 - 直接调用Dify
         
         Args:
-            content: 要分析的文本内容
+            content: 要分析的文本内容，首尾空白会被去除
             analysis_type: 分析类型 (general, summary, extract, sentiment)
             
         Returns:
@@ -295,8 +438,11 @@ class AIAnalysisController:
             ValidationError: 验证失败
             AIAnalysisError: AI分析失败
         """
-        # 验证输入
-        if not content or not content.strip():
+        # 验证输入（只去除一次首尾空白，结果直接传给服务层）
+        if not isinstance(content, str):
+            raise ValidationError("分析内容必须是文本")
+        content = content.strip()
+        if not content:
             raise ValidationError("分析内容不能为空")
         
         if len(content) > 50000:
@@ -306,16 +452,13 @@ class AIAnalysisController:
             # 执行AI分析
             analysis_result = self.ai_analysis_service.analyze_content(content, analysis_type)
             
-            # 清理内存
-            gc.collect()
-            
-            logger.info(f"AI分析完成，内容长度: {len(content)}")
+            logger.info("AI分析完成，内容长度: %s", len(content))
             return analysis_result
             
         except AIAnalysisError:
             raise
         except Exception as e:
-            logger.error(f"AI分析过程中发生错误: {e}")
+            logger.error("AI分析过程中发生错误: %s", e)
             raise AIAnalysisError(f"AI分析失败: {str(e)}")
 
 
@@ -325,21 +468,13 @@ class ResponseHelper:
     @staticmethod
     def success(data: Any = None, message: str = "操作成功") -> Dict[str, Any]:
         """成功响应"""
-        response = {
-            'success': True,
-            'message': message
-        }
-        if data is not None:
-            response['data'] = data
-        return response
+        if data is None:
+            return {'success': True, 'message': message}
+        return {'success': True, 'message': message, 'data': data}
     
     @staticmethod
     def error(message: str, error_code: str = None, status_code: int = 400) -> Tuple[Dict[str, Any], int]:
         """错误响应"""
-        response = {
-            'success': False,
-            'message': message
-        }
-        if error_code:
-            response['error_code'] = error_code
-        return response, status_code
\ No newline at end of file
+        if not error_code:
+            return {'success': False, 'message': message}, status_code
+        return {'success': False, 'message': message, 'error_code': error_code}, status_code
\ No newline at end of file
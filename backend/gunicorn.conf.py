@@ -0,0 +1,44 @@
+"""
+Gunicorn配置
+生产环境启动方式: gunicorn -c gunicorn.conf.py api:app
+"""
+import multiprocessing
+import os
+
+# 监听地址
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:20010')
+
+# 工作进程：gthread模式，每个进程内多线程并发处理请求
+# 每个工作进程都会在 gpu:0 上加载一份完整的PaddleOCR模型（检测+识别+方向分类），
+# 显存与内存占用随进程数线性增长，因此默认只启动1个；建议每块GPU 1-2 个，
+# 进程内的请求并发由线程提供（推理由引擎锁串行，读盘、渲染、AI分析可重叠）
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+worker_class = 'gthread'
+
+# PDF并行渲染使用spawn子进程，`python api.py` 开发模式下子进程会重新导入api模块，
+# 因此只在gunicorn下默认开启；按工作进程数分摊CPU核数
+os.environ.setdefault('PDF_RENDER_WORKERS', str(max(2, multiprocessing.cpu_count() // workers)))
+
+# AI分析请求大部分时间阻塞在等待Dify响应上，默认线程数为AI并发上限加OCR并发上限，
+# 避免分析请求占满线程导致上传请求排队
+threads = int(os.environ.get(
+    'GUNICORN_THREADS',
+    int(os.environ.get('AI_MAX_WORKERS', 32)) + int(os.environ.get('OCR_MAX_WORKERS', 4))
+))
+
+
+def pre_fork(server, worker):
+    """
+    在主进程中为新工作进程分配日志槽位：取当前存活工作进程未占用的最小编号
+    被回收或崩溃的工作进程的槽位由替换它的进程沿用，日志文件数只取决于同时存活的进程数
+    """
+    used = {getattr(w, 'log_slot', None) for w in server.WORKERS.values()}
+    worker.log_slot = next(i for i in range(len(used) + 1) if i not in used)
+
+
+def post_fork(server, worker):
+    """
+    工作进程中导入应用前设置槽位号，logging_config 据此命名日志文件（如 logs/api.0.log）
+    依赖应用在工作进程中导入，不要开启 preload_app
+    """
+    os.environ['LOG_WORKER_ID'] = str(worker.log_slot)
@@ -0,0 +1,155 @@
+"""
+日志配置模块
+提供根日志配置，以及带缓冲的文件日志输出以减少高频请求日志的写盘次数
+"""
+import logging
+import os
+import threading
+import time
+from logging.handlers import MemoryHandler, RotatingFileHandler
+from typing import Iterable
+
+# 非DEBUG级别使用的精简格式，不含时间戳，省去每条记录的时间格式化
+LEAN_LOG_FORMAT = '%(levelname)s - %(name)s - %(message)s'
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """带写缓冲的滚动文件日志处理器，支持多条记录合并写入"""
+
+    def __init__(self, filename: str, buffer_size: int = 64 * 1024, **kwargs):
+        """
+        初始化文件日志处理器
+
+        Args:
+            filename: 日志文件路径
+            buffer_size: 文件写缓冲大小（字节）
+        """
+        self.buffer_size = buffer_size
+        super().__init__(filename, **kwargs)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def emit_batch(self, records: Iterable[logging.LogRecord]) -> None:
+        """
+        将多条日志记录合并为一次写入
+
+        Args:
+            records: 日志记录列表
+        """
+        records = [record for record in records if self.filter(record)]
+        if not records:
+            return
+
+        self.acquire()
+        try:
+            if self.shouldRollover(records[0]):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(''.join(self.format(record) + self.terminator for record in records))
+            self.stream.flush()
+        except Exception:
+            self.handleError(records[0])
+        finally:
+            self.release()
+
+
+class BatchingMemoryHandler(MemoryHandler):
+    """内存缓冲日志处理器，缓冲区满、出现ERROR或距上次写入超过刷新间隔时批量写入目标文件"""
+
+    def __init__(self, capacity: int, flush_interval: float = 2.0, **kwargs):
+        """
+        初始化内存缓冲处理器
+
+        Args:
+            capacity: 缓冲的日志条数上限
+            flush_interval: 最长刷新间隔（秒），空闲时也由后台线程按此间隔写出，
+                进程被强制终止时最多丢失这段时间内的日志
+        """
+        super().__init__(capacity, **kwargs)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name='log-flush', daemon=True)
+        self._flusher.start()
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return (super().shouldFlush(record)
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self.target and self.buffer:
+                self.target.emit_batch(self.buffer)
+                self.buffer.clear()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self._closed.set()
+        super().close()
+
+
+def configure_logging(level: str, fmt: str) -> None:
+    """
+    配置根日志，非DEBUG级别时使用精简格式并关闭线程/进程信息采集
+
+    Args:
+        level: 日志级别
+        fmt: DEBUG级别使用的日志格式
+    """
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    level = level.upper()
+    logging.basicConfig(level=level, format=fmt if level == 'DEBUG' else LEAN_LOG_FORMAT)
+
+
+def add_buffered_file_handler(logger: logging.Logger, log_file: str, fmt: str,
+                              capacity: int = 128, max_bytes: int = 64 << 20,
+                              backup_count: int = 5, flush_interval: float = 2.0) -> MemoryHandler:
+    """
+    为logger添加带缓冲的滚动文件输出，日志不再向root logger传递
+    gunicorn下文件名附加工作进程槽位号（如 api.0.log，由 gunicorn.conf.py 通过
+    LOG_WORKER_ID 环境变量传入），多个工作进程各自写入和滚动自己的文件，避免并发滚动时
+    互相重命名文件导致日志丢失；工作进程重启后沿用原槽位继续追加，文件数不随重启累积
+
+    Args:
+        logger: 目标logger
+        log_file: 日志文件路径（设置了 LOG_WORKER_ID 时实际文件名会附加槽位号）
+        fmt: 日志格式
+        capacity: 内存缓冲的日志条数
+        max_bytes: 单个日志文件最大字节数
+        backup_count: 保留的历史日志文件数
+        flush_interval: 缓冲日志的最长刷新间隔（秒）
+
+    Returns:
+        添加的内存缓冲处理器
+    """
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    worker_id = os.environ.get('LOG_WORKER_ID')
+    if worker_id:
+        root, ext = os.path.splitext(log_file)
+        log_file = f"{root}.{worker_id}{ext}"
+
+    file_handler = BufferedRotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(logging.Formatter(fmt))
+
+    memory_handler = BatchingMemoryHandler(
+        capacity, flush_interval=flush_interval,
+        flushLevel=logging.ERROR, target=file_handler, flushOnClose=True
+    )
+    logger.addHandler(memory_handler)
+    logger.propagate = False
+    return memory_handler
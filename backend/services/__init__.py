@@ -1,12 +1,14 @@
 """
 服务模块
 """
-from .ocr_service import OCRService, BatchOCRService
+from .ocr_service import OCRService, BatchOCRService, get_ocr_service
 from .file_processor import (
     FileProcessor, PDFProcessor, ImageProcessor,
-    PreviewGenerator, FileManager
+    PreviewGenerator, FileManager, RawImage, open_pdf
 )
 from .ai_analysis_service import AIAnalysisService
+from .result_cache import OCRResultCache
+from .accel import check_image_acceleration
 from .exceptions import (
     BaseAppException, OCRError, FileProcessingError,
     UnsupportedFileError, FileSizeError, ValidationError,
@@ -16,12 +18,17 @@ from .exceptions import (
 __all__ = [
     'OCRService',
     'BatchOCRService',
+    'get_ocr_service',
     'FileProcessor',
     'PDFProcessor',
     'ImageProcessor',
     'PreviewGenerator',
     'FileManager',
+    'RawImage',
+    'open_pdf',
     'AIAnalysisService',
+    'OCRResultCache',
+    'check_image_acceleration',
     'BaseAppException',
     'OCRError',
     'FileProcessingError',
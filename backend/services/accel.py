@@ -0,0 +1,90 @@
+"""
+硬件加速检测模块
+在导入时统一探测CPU指令集与可选的加速库，各处理模块据此选择实现
+"""
+from functools import lru_cache
+from types import ModuleType
+from typing import FrozenSet, Optional
+import importlib
+import logging
+
+import PIL
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def cpu_flags() -> FrozenSet[str]:
+    """
+    读取CPU支持的指令集标志（仅Linux，其他平台返回空集合）
+
+    Returns:
+        指令集标志集合，如 {'sse4_1', 'avx2', ...}
+    """
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return frozenset(line.split(':', 1)[1].split())
+    except OSError:
+        pass
+    return frozenset()
+
+
+def has_avx2() -> bool:
+    """CPU是否支持AVX2指令集"""
+    return 'avx2' in cpu_flags()
+
+
+def is_pillow_simd() -> bool:
+    """当前PIL是否为Pillow-SIMD（其版本号带 .postN 后缀）"""
+    return '.post' in PIL.__version__
+
+
+def _optional_import(name: str) -> Optional[ModuleType]:
+    """导入可选依赖，未安装或其系统库缺失时返回None"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+# 可选加速库：OpenCV（RGB→BGR通道交换）、PyTurboJPEG（JPEG缩放解码）
+cv2 = _optional_import('cv2')
+turbojpeg = _optional_import('turbojpeg')
+
+
+def _load_turbojpeg_decoder():
+    """创建libjpeg-turbo解码器（turbojpeg.TurboJPEG），未安装绑定或找不到动态库时返回None"""
+    if turbojpeg is None:
+        return None
+    try:
+        return turbojpeg.TurboJPEG()
+    except Exception as e:
+        logger.warning("libjpeg-turbo加载失败，缩略图改用PIL解码: %s", e)
+        return None
+
+
+# 解码器每次调用独立创建句柄，可在线程间共享
+turbojpeg_decoder = _load_turbojpeg_decoder()
+
+HAS_AVX2 = has_avx2()
+HAS_OPENCV = cv2 is not None
+HAS_TURBOJPEG = turbojpeg_decoder is not None
+
+
+def check_image_acceleration() -> None:
+    """启动时记录所选的图像处理实现，加速条件不满足时记录警告"""
+    logger.info("图像处理实现: Pillow%s %s, AVX2=%s, 通道交换=%s, JPEG缩略图解码=%s",
+                '-SIMD' if is_pillow_simd() else '', PIL.__version__,
+                HAS_AVX2 if cpu_flags() else '未知',
+                'OpenCV' if HAS_OPENCV else 'NumPy',
+                'libjpeg-turbo' if HAS_TURBOJPEG else 'PIL draft')
+
+    if not cpu_flags():
+        return
+    if not HAS_AVX2:
+        logger.warning("CPU不支持AVX2，Pillow-SIMD的缩放/编解码加速不可用（SSE4版本需使用 -msse4 编译）")
+    elif not is_pillow_simd():
+        logger.warning("CPU支持AVX2，但当前安装的是Pillow %s，建议替换为pillow-simd以加速图片处理",
+                       PIL.__version__)
@@ -3,32 +3,65 @@ AI分析服务
 直接调用Dify工作流API进行内容分析
 """
 import logging
+from datetime import datetime
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Any, Optional
 from .exceptions import AIAnalysisError
 
 logger = logging.getLogger(__name__)
 logger.propagate = True
 
+
+def _create_session() -> requests.Session:
+    """创建带连接池的HTTP会话，复用到Dify的keep-alive连接"""
+    session = requests.Session()
+    # 连接池容纳API进程内全部AI分析线程的并发请求，网关类5xx错误自动重试
+    adapter = HTTPAdapter(
+        pool_connections=16, pool_maxsize=64,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# 进程内所有Dify调用共用的模块级会话（未显式传入会话时使用）
+_SESSION = _create_session()
+
+
 class AIAnalysisService:
     """AI分析服务类 - 直接调用Dify工作流"""
     
-    def __init__(self, dify_models_config: Dict[str, Dict[str, str]] = None):
+    def __init__(self, dify_models_config: Dict[str, Dict[str, str]] = None,
+                 session: Optional[requests.Session] = None):
         """
         初始化AI分析服务
         
         Args:
             dify_models_config: Dify模型配置字典
+            session: 复用连接的HTTP会话，为None时使用模块级共享会话
         """
         self.dify_models = dify_models_config or {}
+        self.session = session or _SESSION
         self.timeout = 60  # 增加超时时间以适应AI响应
+        # 各模型的请求头在初始化时构建一次
+        self._headers_by_type = {
+            analysis_type: {
+                "Authorization": f"Bearer {model_config.get('token', '')}",
+                "Content-Type": "application/json"
+            }
+            for analysis_type, model_config in self.dify_models.items()
+        }
         
     def analyze_content(self, content: str, analysis_type: str = "general") -> Dict[str, Any]:
         """
         分析内容 - 直接调用指定类型的Dify模型
         
         Args:
-            content: 要分析的文本内容
+            content: 要分析的文本内容（由调用方完成去空白和非空校验）
             analysis_type: 分析类型 (general, summary, extract, sentiment等)
             
         Returns:
@@ -37,9 +70,6 @@ class AIAnalysisService:
         Raises:
             AIAnalysisError: AI分析失败
         """
-        if not content or not content.strip():
-            raise AIAnalysisError("分析内容不能为空")
-            
         if analysis_type not in self.dify_models:
             raise AIAnalysisError(f"不支持的分析类型: {analysis_type}")
             
@@ -49,12 +79,12 @@ class AIAnalysisService:
             
         try:
             # 直接调用Dify API
-            response = self._call_dify_api(content, model_config)
+            response = self._call_dify_api(content, analysis_type)
             
             # 处理响应
             result = self._process_response(response)
             
-            logger.info(f"AI分析完成，内容长度: {len(content)}, 分析类型: {analysis_type}")
+            logger.info("AI分析完成，内容长度: %s, 分析类型: %s", len(content), analysis_type)
             
             return {
                 "success": True,
@@ -65,27 +95,25 @@ class AIAnalysisService:
             }
             
         except requests.RequestException as e:
-            logger.error(f"Dify API请求失败: {e}")
+            logger.error("Dify API请求失败: %s", e)
             raise AIAnalysisError(f"AI服务请求失败: {str(e)}")
         except Exception as e:
-            logger.error(f"AI分析过程中发生错误: {e}")
+            logger.error("AI分析过程中发生错误: %s", e)
             raise AIAnalysisError(f"AI分析失败: {str(e)}")
     
-    def _call_dify_api(self, content: str, model_config: Dict[str, str]) -> Dict[str, Any]:
+    def _call_dify_api(self, content: str, analysis_type: str) -> Dict[str, Any]:
         """
         调用Dify工作流API
         
         Args:
             content: 输入内容
-            model_config: 模型配置 (包含url和token)
+            analysis_type: 分析类型，对应的模型配置包含url和token
             
         Returns:
             API响应结果
         """
-        headers = {
-            "Authorization": f"Bearer {model_config['token']}",
-            "Content-Type": "application/json"
-        }
+        model_config = self.dify_models[analysis_type]
+        headers = self._headers_by_type[analysis_type]
         
         # 按照Dify官方API格式构建请求体
         payload = {
@@ -96,21 +124,22 @@ class AIAnalysisService:
             "user": "paddle-doc-scan-user"
         }
         
-        logger.info(f"调用Dify API: {model_config['url']}")
-        logger.debug(f"请求头: {headers}")
-        logger.debug(f"请求体: {payload}")
+        logger.info("调用Dify API: %s", model_config['url'])
+        logger.debug("请求头: %s", headers)
+        logger.debug("请求体: %s", payload)
         
-        response = requests.post(
+        # orjson直接输出UTF-8字节，中文内容无需转义
+        response = self.session.post(
             model_config['url'],
-            json=payload,
+            data=orjson.dumps(payload),
             headers=headers,
             timeout=self.timeout
         )
         
         # 记录响应状态
-        logger.info(f"API响应状态: {response.status_code}")
+        logger.info("API响应状态: %s", response.status_code)
         if response.status_code != 200:
-            logger.error(f"API响应内容: {response.text}")
+            logger.error("API响应内容: %s", response.text)
         
         response.raise_for_status()
         return response.json()
@@ -143,12 +172,11 @@ class AIAnalysisService:
         elif "result" in response:
             return response["result"]
         else:
-            logger.warning(f"未识别的响应格式: {response}")
+            logger.warning("未识别的响应格式: %s", response)
             return "AI分析完成，但未获取到具体结果"
     
     def _get_timestamp(self) -> str:
         """获取当前时间戳"""
-        from datetime import datetime
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     def get_service_info(self) -> Dict[str, Any]:
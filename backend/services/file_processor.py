@@ -2,9 +2,15 @@
 文件处理工具模块
 提供PDF和图片文件的处理功能
 """
-from typing import List, Optional, Tuple, Union, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union, Dict, Any
+import multiprocessing
 import os
-import uuid
+import threading
+import secrets
+import shutil
 import base64
 import tempfile
 from pathlib import Path
@@ -14,18 +20,64 @@ from PIL import Image
 import io
 
 from .exceptions import FileProcessingError, UnsupportedFileError
+from .accel import turbojpeg, turbojpeg_decoder
+
+
+def _fast_decode_scaled(data: bytes, target: Tuple[int, int]) -> Optional[Image.Image]:
+    """
+    用libjpeg-turbo的DCT缩放直接解码出缩小的JPEG图片
+    
+    Args:
+        data: 图片字节数据
+        target: 目标尺寸 (width, height)，解码结果不小于按该尺寸等比缩放后的大小
+        
+    Returns:
+        RGB格式的PIL Image对象；非JPEG数据或解码器不可用时返回None
+    """
+    jpeg = turbojpeg_decoder
+    if jpeg is None or not data.startswith(b'\xff\xd8'):
+        return None
+
+    try:
+        width, height, _, _ = jpeg.decode_header(data)
+        # thumbnail等比缩放到目标框内，选取不小于该比例的最小缩放因子；
+        # 只考虑缩小的因子（libjpeg-turbo还提供最大2/1的放大因子），原图不大于目标时按原尺寸解码
+        ratio = min(target[0] / width, target[1] / height)
+        factor = min(
+            (f for f in jpeg.scaling_factors if f[0] <= f[1] and f[0] / f[1] >= ratio),
+            key=lambda f: f[0] / f[1],
+            default=(1, 1)
+        )
+        return Image.fromarray(jpeg.decode(data, pixel_format=turbojpeg.TJPF_RGB, scaling_factor=factor))
+    except Exception as e:
+        logging.getLogger(__name__).debug("libjpeg-turbo解码失败，改用PIL: %s", e)
+        return None
 
 
 class FileProcessor:
     """文件处理基类"""
 
-    ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'bmp', 'tiff'}
+    ALLOWED_EXTENSIONS = frozenset({'pdf', 'png', 'jpg', 'jpeg', 'bmp', 'tiff'})
+    ALLOWED_EXTENSIONS_DISPLAY = ', '.join(sorted(ALLOWED_EXTENSIONS))  # 错误提示中展示的格式列表
     MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.logger.propagate = True  # 允许向上级 logger 传递到 root logger
 
+    @staticmethod
+    def extension_of(filename: str) -> str:
+        """
+        获取文件扩展名，不含扩展名时返回空字符串
+        
+        Args:
+            filename: 文件名
+            
+        Returns:
+            文件扩展名（小写，不含点号）
+        """
+        return os.path.splitext(filename)[1][1:].lower()
+
     @classmethod
     def is_allowed_file(cls, filename: str) -> bool:
         """
@@ -37,8 +89,7 @@ class FileProcessor:
         Returns:
             是否为允许的格式
         """
-        return ('.' in filename and
-                filename.rsplit('.', 1)[1].lower() in cls.ALLOWED_EXTENSIONS)
+        return cls.extension_of(filename) in cls.ALLOWED_EXTENSIONS
 
     @classmethod
     def get_file_extension(cls, filename: str) -> str:
@@ -51,9 +102,10 @@ class FileProcessor:
         Returns:
             文件扩展名（小写）
         """
-        if '.' not in filename:
+        ext = cls.extension_of(filename)
+        if not ext:
             raise FileProcessingError("文件名没有扩展名")
-        return filename.rsplit('.', 1)[1].lower()
+        return ext
 
     @classmethod
     def validate_file_size(cls, file_size: int) -> bool:
@@ -80,107 +132,280 @@ class FileProcessor:
             唯一文件名
         """
         ext = cls.get_file_extension(original_filename)
-        return f"{uuid.uuid4().hex}_{original_filename}"
+        return f"{secrets.token_hex(16)}_{original_filename}"
+
+
+class RawImage(NamedTuple):
+    """未经编码的RGB像素数据"""
+    data: bytes
+    width: int
+    height: int
+
+    def to_image(self) -> Image.Image:
+        """直接基于像素缓冲构造PIL图片，无需解码"""
+        return Image.frombuffer('RGB', (self.width, self.height), self.data, 'raw', 'RGB', 0, 1)
+
+
+# PDF来源：文件路径，或调用方已打开的文档（同一请求内复用，避免重复解析xref）
+PDFSource = Union[str, fitz.Document]
+
+# PyMuPDF不支持多线程并发调用，进程内所有打开、渲染、关闭文档的操作都须持有该锁
+# （渲染进程池中的工作进程各有一份，互不影响）
+_MUPDF_LOCK = threading.RLock()
+
+
+@contextmanager
+def open_pdf(source: PDFSource) -> Iterator[fitz.Document]:
+    """
+    打开PDF文档，传入已打开的文档时直接复用且不负责关闭
+    
+    Args:
+        source: PDF文件路径或已打开的文档
+        
+    Yields:
+        PDF文档对象
+        
+    Raises:
+        FileProcessingError: 文件不存在或无法作为PDF打开
+    """
+    if isinstance(source, fitz.Document):
+        yield source
+        return
+
+    if not os.path.exists(source):
+        raise FileProcessingError(f"PDF文件不存在: {source}")
+    try:
+        with _MUPDF_LOCK:
+            doc = fitz.open(source)
+    except Exception as e:
+        # 文件损坏、截断或并非PDF时，统一作为文件处理错误上报
+        raise FileProcessingError(f"PDF文件打开失败: {e}") from e
+    try:
+        yield doc
+    finally:
+        with _MUPDF_LOCK:
+            doc.close()
+
+
+@lru_cache(maxsize=8)
+def _dpi_matrix(dpi: int) -> fitz.Matrix:
+    """按DPI缓存缩放矩阵，各页及各次调用共用"""
+    return fitz.Matrix(dpi / 72, dpi / 72)
+
+
+def _iter_rendered_pages(pdf_source: PDFSource, page_indices: Sequence[int], dpi: int,
+                         max_long_edge: int = 0) -> Iterator[Tuple[int, RawImage]]:
+    """
+    逐页渲染PDF的指定页为RGB像素数据，每次只生成一页
+    
+    Args:
+        pdf_source: PDF文件路径或已打开的文档
+        page_indices: 要渲染的页码（从0开始）
+        dpi: 图片分辨率
+        max_long_edge: 渲染结果长边的像素上限，超出时按页降低分辨率，0表示不限制
+        
+    Yields:
+        (页码, 像素数据)，转换失败的页被跳过
+    """
+    logger = logging.getLogger(__name__)
+    with open_pdf(pdf_source) as doc:
+        mat = _dpi_matrix(dpi)
+        for page_num in page_indices:
+            try:
+                # 逐页持锁，生成器挂起期间不占用MuPDF
+                with _MUPDF_LOCK:
+                    page = doc.load_page(page_num)
+                    page_mat = mat
+                    if max_long_edge > 0:
+                        # 页面尺寸单位为点（1/72英寸），按长边上限计算该页的有效缩放
+                        zoom = max_long_edge / max(page.rect.width, page.rect.height)
+                        if zoom < mat.a:
+                            page_mat = fitz.Matrix(zoom, zoom)
+                    pix = page.get_pixmap(matrix=page_mat, alpha=False)
+                    image = RawImage(pix.samples, pix.width, pix.height)
+                    # samples已复制出像素，立即释放Pixmap，同一时刻只保留一页的渲染缓冲
+                    del pix
+                logger.debug("第 %s 页转换完成", page_num + 1)
+            except Exception as e:
+                logger.error("第 %s 页转换失败: %s", page_num + 1, e)
+                continue  # 跳过坏页，继续下一页
+            yield page_num, image
+
+
+def _render_pages(pdf_source: PDFSource, page_indices: Sequence[int], dpi: int,
+                  max_long_edge: int = 0) -> List[Tuple[int, RawImage]]:
+    """
+    渲染PDF的指定页为RGB像素数据（渲染进程池的工作函数，需定义在模块级别）
+    
+    Args:
+        pdf_source: PDF文件路径或已打开的文档（进程池中只能传路径）
+        page_indices: 要渲染的页码（从0开始）
+        dpi: 图片分辨率
+        max_long_edge: 渲染结果长边的像素上限，超出时按页降低分辨率，0表示不限制
+        
+    Returns:
+        (页码, 像素数据) 列表，转换失败的页被跳过
+    """
+    return list(_iter_rendered_pages(pdf_source, page_indices, dpi, max_long_edge))
 
 
 class PDFProcessor(FileProcessor):
     """PDF文件处理器"""
 
-    def convert_to_images(self, pdf_path: str, dpi: int = 200) -> List[bytes]:
-        if not os.path.exists(pdf_path):
-            raise FileProcessingError(f"PDF文件不存在: {pdf_path}")
+    # 页数少于该值时直接在当前进程渲染，不值得跨进程传输
+    PARALLEL_MIN_PAGES = 3
 
-        images = []
-        doc = None
-        try:
-            doc = fitz.open(pdf_path)
-            self.logger.info(f"PDF文件包含 {len(doc)} 页")
+    _render_pool: Optional[ProcessPoolExecutor] = None
+    _render_pool_lock = threading.Lock()
 
-            for page_num in range(len(doc)):
-                try:
-                    page = doc.load_page(page_num)
-                    mat = fitz.Matrix(dpi / 72, dpi / 72)
-                    pix = page.get_pixmap(matrix=mat)
-                    img_data = pix.tobytes("png")
-                    images.append(img_data)
-                    self.logger.debug(f"第 {page_num + 1} 页转换完成")
-                except Exception as e:
-                    self.logger.error(f"第 {page_num + 1} 页转换失败: {e}")
-                    continue  # 跳过坏页，继续下一页
+    def __init__(self, render_workers: int = 0):
+        """
+        初始化PDF处理器
+        
+        Args:
+            render_workers: 并行渲染页面的进程数，0表示在当前进程中顺序渲染
+        """
+        super().__init__()
+        self.render_workers = render_workers
+
+    @classmethod
+    def _get_render_pool(cls, max_workers: int) -> ProcessPoolExecutor:
+        """获取进程内共享的渲染进程池（首次使用时创建）"""
+        with cls._render_pool_lock:
+            if cls._render_pool is None:
+                # spawn方式启动，避免在已加载模型、已有线程的进程中fork
+                cls._render_pool = ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return cls._render_pool
 
-            return images
+    @classmethod
+    def shutdown_render_pool(cls) -> None:
+        """关闭共享的渲染进程池并等待渲染进程退出，之后再次并行渲染时会重新创建"""
+        with cls._render_pool_lock:
+            pool, cls._render_pool = cls._render_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
 
+    def convert_to_images(self, pdf_source: PDFSource, dpi: int = 200, max_long_edge: int = 1600) -> List[RawImage]:
+        """
+        将PDF各页渲染为RGB像素数据
+        
+        Args:
+            pdf_source: PDF文件路径或已打开的文档
+            dpi: 图片分辨率
+            max_long_edge: 长边像素上限，OCR检测模型会将输入缩小到约960像素，
+                更高的分辨率只增加渲染和识别开销；0表示不限制
+            
+        Returns:
+            按页顺序排列的像素数据列表
+        """
+        try:
+            with open_pdf(pdf_source) as doc:
+                with _MUPDF_LOCK:
+                    page_count = len(doc)
+                    # 渲染进程需按路径重新打开文档，内存中的文档没有路径时只能顺序渲染
+                    pdf_path = doc.name
+                self.logger.info("PDF文件包含 %s 页", page_count)
+
+                if self.render_workers <= 0 or page_count < self.PARALLEL_MIN_PAGES or not pdf_path:
+                    rendered = _render_pages(doc, range(page_count), dpi, max_long_edge)
+                else:
+                    # 按连续页码区间分块，每个工作进程只打开一次文档
+                    workers = min(self.render_workers, page_count)
+                    chunk_size = -(-page_count // workers)
+                    pool = self._get_render_pool(self.render_workers)
+                    futures = [
+                        pool.submit(_render_pages, pdf_path, range(start, min(start + chunk_size, page_count)),
+                                    dpi, max_long_edge)
+                        for start in range(0, page_count, chunk_size)
+                    ]
+                    rendered = [page for future in futures for page in future.result()]
+
+            return [img_data for _, img_data in rendered]
+
+        except FileProcessingError:
+            raise
         except Exception as e:
             raise FileProcessingError(f"PDF转换失败: {e}")
-        finally:
-            if doc:
-                doc.close()
 
-    def get_first_page_image(self, pdf_path: str, dpi: int = 150) -> bytes:
+    def iter_pages(self, pdf_source: PDFSource, dpi: int = 200, max_long_edge: int = 1600) -> Iterator[RawImage]:
+        """
+        按页顺序逐页渲染PDF，调用方处理完一页再渲染下一页，内存中只保留当前页
+        
+        Args:
+            pdf_source: PDF文件路径或已打开的文档
+            dpi: 图片分辨率
+            max_long_edge: 长边像素上限，0表示不限制
+            
+        Yields:
+            各页的像素数据
+        """
+        try:
+            with open_pdf(pdf_source) as doc:
+                with _MUPDF_LOCK:
+                    page_count = len(doc)
+                self.logger.info("PDF文件包含 %s 页", page_count)
+                for _, img_data in _iter_rendered_pages(doc, range(page_count), dpi, max_long_edge):
+                    yield img_data
+        except FileProcessingError:
+            raise
+        except Exception as e:
+            raise FileProcessingError(f"PDF转换失败: {e}")
+
+    def get_first_page_image(self, pdf_source: PDFSource, dpi: int = 150) -> bytes:
         """
         获取PDF第一页图片用于预览
         
         Args:
-            pdf_path: PDF文件路径
+            pdf_source: PDF文件路径或已打开的文档
             dpi: 图片分辨率
             
         Returns:
             第一页图片字节数据
         """
-        if not os.path.exists(pdf_path):
-            raise FileProcessingError(f"PDF文件不存在: {pdf_path}")
+        with open_pdf(pdf_source) as doc:
+            try:
+                with _MUPDF_LOCK:
+                    if len(doc) == 0:
+                        raise FileProcessingError("PDF文件没有页面")
 
-        doc = None
-        try:
-            doc = fitz.open(pdf_path)
-            if len(doc) == 0:
-                raise FileProcessingError("PDF文件没有页面")
-
-            page = doc.load_page(0)
-            mat = fitz.Matrix(dpi / 72, dpi / 72)
-            pix = page.get_pixmap(matrix=mat)
-            return pix.tobytes("png")
+                    page = doc.load_page(0)
+                    pix = page.get_pixmap(matrix=_dpi_matrix(dpi), alpha=False)
+                    return pix.tobytes("png")
 
-        except Exception as e:
-            raise FileProcessingError(f"获取PDF预览失败: {e}")
-        finally:
-            if doc:
-                doc.close()
+            except Exception as e:
+                raise FileProcessingError(f"获取PDF预览失败: {e}")
 
-    def get_pdf_info(self, pdf_path: str) -> Dict[str, Any]:
+    def get_pdf_info(self, pdf_source: PDFSource) -> Dict[str, Any]:
         """
         获取PDF文件信息
         
         Args:
-            pdf_path: PDF文件路径
+            pdf_source: PDF文件路径或已打开的文档
             
         Returns:
             PDF文件信息
         """
-        if not os.path.exists(pdf_path):
-            raise FileProcessingError(f"PDF文件不存在: {pdf_path}")
+        with open_pdf(pdf_source) as doc:
+            try:
+                with _MUPDF_LOCK:
+                    metadata = doc.metadata
+                    page_count = len(doc)
 
-        doc = None
-        try:
-            doc = fitz.open(pdf_path)
-            metadata = doc.metadata
-
-            return {
-                'page_count': len(doc),
-                'title': metadata.get('title', ''),
-                'author': metadata.get('author', ''),
-                'subject': metadata.get('subject', ''),
-                'creator': metadata.get('creator', ''),
-                'producer': metadata.get('producer', ''),
-                'created': metadata.get('creationDate', ''),
-                'modified': metadata.get('modDate', '')
-            }
+                return {
+                    'page_count': page_count,
+                    'title': metadata.get('title', ''),
+                    'author': metadata.get('author', ''),
+                    'subject': metadata.get('subject', ''),
+                    'creator': metadata.get('creator', ''),
+                    'producer': metadata.get('producer', ''),
+                    'created': metadata.get('creationDate', ''),
+                    'modified': metadata.get('modDate', '')
+                }
 
-        except Exception as e:
-            raise FileProcessingError(f"获取PDF信息失败: {e}")
-        finally:
-            if doc:
-                doc.close()
+            except Exception as e:
+                raise FileProcessingError(f"获取PDF信息失败: {e}")
 
 
 class ImageProcessor(FileProcessor):
@@ -188,7 +413,7 @@ class ImageProcessor(FileProcessor):
 
     def validate_image(self, image_path: str) -> bool:
         """
-        验证图片文件是否有效
+        验证图片文件是否有效（仅检查文件头可被识别且尺寸有效）
         
         Args:
             image_path: 图片文件路径
@@ -197,11 +422,11 @@ class ImageProcessor(FileProcessor):
             是否为有效图片
         """
         try:
+            # Image.open只解析文件头，不解码像素；像素数据的损坏在OCR读取时报错
             with Image.open(image_path) as img:
-                img.verify()
-            return True
+                return img.width > 0 and img.height > 0
         except Exception as e:
-            self.logger.error(f"图片验证失败: {e}")
+            self.logger.error("图片验证失败: %s", e)
             return False
 
     def convert_to_rgb(self, image_path: str) -> Image.Image:
@@ -234,6 +459,9 @@ class ImageProcessor(FileProcessor):
             调整后的图片
         """
         try:
+            # JPEG在解码阶段按2的幂次缩小（仅对尚未加载像素的图片生效）
+            if image.format == 'JPEG':
+                image.draft('RGB', max_size)
             image.thumbnail(max_size, Image.Resampling.LANCZOS)
             return image
         except Exception as e:
@@ -265,33 +493,40 @@ class ImageProcessor(FileProcessor):
 class PreviewGenerator:
     """预览图生成器"""
 
+    # 分块编码的块大小，须为3的倍数，各块编码结果可直接拼接而不产生填充
+    PREVIEW_BLOCK_SIZE = 57 * 1024
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.pdf_processor = PDFProcessor()
         self.image_processor = ImageProcessor()
 
-    def generate_preview(self, file_path: str, file_type: str) -> str:
+    def generate_preview(self, file_path: str, file_type: str, pdf_doc: Optional[fitz.Document] = None) -> str:
         """
         生成文件预览（base64编码）
         
         Args:
             file_path: 文件路径
             file_type: 文件类型
+            pdf_doc: 已打开的PDF文档，传入时直接复用而不重新打开文件
             
         Returns:
             base64编码的预览图片
         """
         try:
             if file_type == 'pdf':
-                preview_data = self.pdf_processor.get_first_page_image(file_path)
-            else:
-                with open(file_path, 'rb') as f:
-                    preview_data = f.read()
+                # 渲染结果已在内存中，直接编码
+                return base64.b64encode(self.pdf_processor.get_first_page_image(file_path if pdf_doc is None else pdf_doc)).decode('ascii')
 
-            return base64.b64encode(preview_data).decode('utf-8')
+            # 图片文件分块读取并编码，避免整文件原始数据与编码结果同时驻留内存
+            encoded = bytearray()
+            with open(file_path, 'rb') as f:
+                while block := f.read(self.PREVIEW_BLOCK_SIZE):
+                    encoded += base64.b64encode(block)
+            return encoded.decode('ascii')
 
         except Exception as e:
-            self.logger.error(f"生成预览失败: {e}")
+            self.logger.error("生成预览失败: %s", e)
             raise FileProcessingError(f"生成预览失败: {e}")
 
     def generate_thumbnail(self, image_data: bytes, size: Tuple[int, int] = (300, 300)) -> str:
@@ -306,23 +541,32 @@ class PreviewGenerator:
             base64编码的缩略图
         """
         try:
-            image = Image.open(io.BytesIO(image_data))
+            # JPEG优先由libjpeg-turbo缩放解码，不可用时由PIL的draft完成同样的DCT缩放
+            image = _fast_decode_scaled(image_data, size)
+            if image is None:
+                image = Image.open(io.BytesIO(image_data))
+                if image.format == 'JPEG':
+                    image.draft('RGB', size)
+            # 再由LANCZOS精确缩放到目标尺寸
             image.thumbnail(size, Image.Resampling.LANCZOS)
 
             output = io.BytesIO()
-            image.save(output, format='JPEG', quality=85)
+            # 固定为单遍基线编码与4:2:0采样，缩略图无需optimize的二次熵编码
+            image.save(output, format='JPEG', quality=85, optimize=False, progressive=False, subsampling=2)
             thumbnail_data = output.getvalue()
 
             return base64.b64encode(thumbnail_data).decode('utf-8')
 
         except Exception as e:
-            self.logger.error(f"生成缩略图失败: {e}")
+            self.logger.error("生成缩略图失败: %s", e)
             raise FileProcessingError(f"生成缩略图失败: {e}")
 
 
 class FileManager:
     """文件管理器"""
 
+    COPY_BUFFER_SIZE = 1024 * 1024  # 无法零拷贝保存时的复制块大小
+
     def __init__(self, upload_folder: str):
         """
         初始化文件管理器
@@ -348,14 +592,63 @@ class FileManager:
         try:
             unique_filename = FileProcessor.generate_unique_filename(original_filename)
             file_path = self.upload_folder / unique_filename
-            file_obj.save(str(file_path))
+            if not self._save_spooled_file(file_obj, str(file_path)):
+                self._save_stream(file_obj, str(file_path))
 
-            self.logger.info(f"文件保存成功: {unique_filename}")
+            self.logger.info("文件保存成功: %s", unique_filename)
             return str(file_path), unique_filename
 
         except Exception as e:
             raise FileProcessingError(f"文件保存失败: {e}")
 
+    @staticmethod
+    def _save_spooled_file(file_obj, file_path: str) -> bool:
+        """
+        上传内容已缓冲在磁盘临时文件中时，通过硬链接保存，避免复制文件内容；
+        跨文件系统无法链接时由shutil.copyfile在内核中复制（Linux下为sendfile）
+        
+        Args:
+            file_obj: 文件对象
+            file_path: 目标文件路径
+            
+        Returns:
+            是否已保存
+        """
+        stream = getattr(file_obj, 'stream', None)
+        spooled_path = getattr(stream, 'name', None)
+        if not isinstance(spooled_path, str) or not os.path.isfile(spooled_path):
+            return False
+
+        try:
+            stream.flush()
+            os.link(spooled_path, file_path)
+            return True
+        except OSError:
+            pass
+
+        try:
+            shutil.copyfile(spooled_path, file_path)
+            return True
+        except OSError:
+            return False
+
+    @classmethod
+    def _save_stream(cls, file_obj, file_path: str) -> None:
+        """
+        将上传流写入目标文件：内存缓冲一次写出，其他流以1MiB块复制
+        
+        Args:
+            file_obj: 文件对象
+            file_path: 目标文件路径
+        """
+        stream = getattr(file_obj, 'stream', None)
+        if isinstance(stream, io.BytesIO):
+            with open(file_path, 'wb') as dst:
+                dst.write(stream.getbuffer())
+            return
+
+        file_obj.save(file_path, buffer_size=cls.COPY_BUFFER_SIZE)
+
     def cleanup_file(self, file_path: str) -> bool:
         """
         清理文件
@@ -367,14 +660,31 @@ class FileManager:
             是否清理成功
         """
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                self.logger.info(f"文件清理成功: {file_path}")
-                return True
+            # 直接删除，文件不存在时由异常判断，省去一次stat
+            os.remove(file_path)
+        except FileNotFoundError:
             return False
         except Exception as e:
-            self.logger.error(f"文件清理失败: {e}")
+            self.logger.error("文件清理失败: %s", e)
             return False
+        self.logger.info("文件清理成功: %s", file_path)
+        return True
+
+    @contextmanager
+    def cleanup_on_exit(self, file_path: str) -> Iterator[str]:
+        """
+        在with块结束时清理文件，无论处理成功与否
+        
+        Args:
+            file_path: 文件路径
+            
+        Yields:
+            文件路径
+        """
+        try:
+            yield file_path
+        finally:
+            self.cleanup_file(file_path)
 
     def get_temp_path(self, filename: str) -> str:
         """
@@ -387,4 +697,4 @@ class FileManager:
             临时文件路径
         """
         temp_dir = tempfile.gettempdir()
-        return os.path.join(temp_dir, f"temp_{uuid.uuid4().hex}_{filename}")
+        return os.path.join(temp_dir, f"temp_{secrets.token_hex(16)}_{filename}")
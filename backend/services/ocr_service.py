@@ -2,18 +2,60 @@
 OCR服务模块
 提供文档OCR识别功能
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from typing import List, Optional, Union, Dict, Any
 import os
-import uuid
-import tempfile
 from pathlib import Path
 from PIL import Image
 import io
 import base64
 import logging
-from paddleocr import PaddleOCR
-import traceback
+import threading
+import numpy as np
 from .exceptions import OCRError, FileProcessingError
+from .accel import cv2  # PaddleOCR依赖OpenCV，正常部署时已安装；未安装时为None
+from .file_processor import RawImage
+
+# 批量识别时每批提交的图片数，限制同时驻留内存的输入数组和单次持有引擎锁的时间
+DEFAULT_BATCH_SIZE = 8
+
+
+@lru_cache(maxsize=8)
+def _get_ocr(lang: str, use_angle_cls: bool):
+    """
+    获取进程内共享的PaddleOCR引擎，相同参数只加载一次检测/识别/方向分类模型
+    Paddle预测器不是线程安全的，推理调用须持有 _get_ocr_lock 返回的同参数锁
+
+    Args:
+        lang: 识别语言
+        use_angle_cls: 是否使用角度分类器
+
+    Returns:
+        PaddleOCR实例
+    """
+    # 延迟导入，PDF渲染子进程导入services包时无需加载PaddleOCR
+    from paddleocr import PaddleOCR
+    return PaddleOCR(
+        use_angle_cls=use_angle_cls,
+        lang=lang,
+        device='gpu:0'
+    )
+
+
+@lru_cache(maxsize=8)
+def _get_ocr_lock(lang: str, use_angle_cls: bool) -> threading.Lock:
+    """
+    获取与共享引擎一一对应的推理锁，同一引擎同一时刻只执行一次推理
+
+    Args:
+        lang: 识别语言
+        use_angle_cls: 是否使用角度分类器
+
+    Returns:
+        该引擎的互斥锁
+    """
+    return threading.Lock()
 
 
 class OCRService:
@@ -31,22 +73,19 @@ class OCRService:
         self.logger.setLevel(logging.INFO)
         self.logger.propagate = True  # 允许向上级 logger 传递到 root logger
         try:
-            self.ocr = PaddleOCR(
-                use_angle_cls=use_angle_cls,
-                lang=lang,
-                device='gpu:0'
-            )
+            self.ocr = _get_ocr(lang, use_angle_cls)
+            self._ocr_lock = _get_ocr_lock(lang, use_angle_cls)
             self.logger.info("PaddleOCR初始化成功")
         except Exception as e:
-            self.logger.error(f"PaddleOCR初始化失败: {e}")
+            self.logger.error("PaddleOCR初始化失败: %s", e)
             raise OCRError(f"OCR服务初始化失败: {e}")
 
-    def recognize_image(self, image_data: Union[str, bytes, Image.Image]) -> str:
+    def recognize_image(self, image_data: Union[str, bytes, Image.Image, RawImage]) -> str:
         """
         识别图片中的文字
 
         Args:
-            image_data: 图片数据，可以是文件路径、字节数据或PIL Image对象
+            image_data: 图片数据，可以是文件路径、字节数据、PIL Image对象或RGB像素数据
 
         Returns:
             识别出的文本内容
@@ -54,76 +93,118 @@ class OCRService:
         Raises:
             OCRError: OCR识别失败时抛出
         """
-        temp_path: Optional[str] = None
-
         try:
-            # 处理不同类型的输入数据
-            if isinstance(image_data, str):
-                # 文件路径
-                if not os.path.exists(image_data):
-                    raise FileProcessingError(f"图片文件不存在: {image_data}")
-                temp_path = image_data
-                created_temp = False
-            else:
-                # 字节数据或PIL Image对象
-                image = self._prepare_image(image_data)
-                temp_path = self._save_temp_image(image)
-                created_temp = True
-
-            if not os.path.exists(temp_path):
-                self.logger.error(f"file {temp_path} not exists")
-                raise FileProcessingError(f"file {temp_path} not exists")
-
-            result = self.ocr.ocr(temp_path)
+            result = self._run_ocr(self._to_ocr_input(image_data))
             extracted_text = self._extract_text_from_result(result)
 
-            self.logger.info(f"OCR识别完成，识别出{len(extracted_text.splitlines())}行文本")
+            self.logger.info("OCR识别完成，识别出%s行文本", len(extracted_text.splitlines()))
             return extracted_text
 
         except Exception as e:
-            self.logger.error(f"OCR识别失败: {e}\n{traceback.format_exc()}")
-            raise OCRError(f"OCR识别失败: {e}")
-        finally:
-            # 清理临时文件
-            if temp_path and created_temp and os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except Exception as e:
-                    self.logger.warning(f"清理临时文件失败: {e}")
+            self.logger.exception("OCR识别失败")
+            raise OCRError(f"OCR识别失败: {e}") from e
 
-    def recognize_multiple_images(self, images_data: List[Union[str, bytes, Image.Image]]) -> List[str]:
+    def recognize_multiple_images(self, images_data: List[Union[str, bytes, Image.Image, RawImage]],
+                                  batch_size: int = DEFAULT_BATCH_SIZE) -> List[str]:
         """
         批量识别多张图片
 
+        按 batch_size 张分批提交PaddleOCR批量推理：同时转换为数组的图片数量有上限，
+        引擎锁只在单批推理期间持有，其他请求可以在批次之间插入
+
         Args:
             images_data: 图片数据列表
+            batch_size: 每批提交的图片数
 
         Returns:
             识别结果列表
         """
+        batch_size = max(1, batch_size)
+        results: List[str] = []
+        for start in range(0, len(images_data), batch_size):
+            results.extend(self._recognize_batch(images_data[start:start + batch_size], start))
+        return results
+
+    def _recognize_batch(self, images_data: List[Union[str, bytes, Image.Image, RawImage]],
+                         offset: int) -> List[str]:
+        """
+        识别一批图片，批量推理失败时仅对本批逐张识别
+
+        Args:
+            images_data: 本批图片数据
+            offset: 本批首张图片在全部图片中的下标，用于日志
+
+        Returns:
+            本批识别结果列表
+        """
+        try:
+            batch_results = self._run_ocr([self._to_ocr_input(image_data) for image_data in images_data])
+            if len(batch_results) != len(images_data) or not all(isinstance(r, dict) for r in batch_results):
+                raise OCRError("批量识别结果格式不匹配")
+            texts = [self._extract_text_from_result([r]) for r in batch_results]
+            self.logger.info("批量识别完成，第%s-%s张图片", offset + 1, offset + len(texts))
+            return texts
+        except Exception as e:
+            self.logger.warning("第%s-%s张图片批量识别失败，改为逐张识别: %s",
+                                offset + 1, offset + len(images_data), e)
+
         results = []
-        for i, image_data in enumerate(images_data):
+        for i, image_data in enumerate(images_data, offset + 1):
             try:
                 text = self.recognize_image(image_data)
                 results.append(text)
-                self.logger.info(f"第{i + 1}张图片识别完成")
+                self.logger.info("第%s张图片识别完成", i)
             except Exception as e:
-                self.logger.error(f"第{i + 1}张图片识别失败: {e}")
+                self.logger.error("第%s张图片识别失败: %s", i, e)
                 results.append("")  # 识别失败时添加空字符串
 
         return results
 
-    def _prepare_image(self, image_data: Union[bytes, Image.Image]) -> Image.Image:
+    def _run_ocr(self, ocr_input: Union[str, np.ndarray, List[Union[str, np.ndarray]]]) -> List[Any]:
+        """
+        在引擎锁内执行推理，输入预处理在锁外完成，多线程调用时仅推理本身串行
+
+        Args:
+            ocr_input: 单个或一组PaddleOCR输入
+
+        Returns:
+            PaddleOCR原始识别结果
+        """
+        with self._ocr_lock:
+            return self.ocr.ocr(ocr_input)
+
+    def _to_ocr_input(self, image_data: Union[str, bytes, Image.Image, RawImage]) -> Union[str, np.ndarray]:
+        """
+        转换为PaddleOCR的输入
+
+        Args:
+            image_data: 文件路径、字节数据、PIL Image对象或RGB像素数据
+
+        Returns:
+            文件路径，或内存图片对应的数组
+        """
+        if isinstance(image_data, str):
+            # 文件路径
+            if not os.path.exists(image_data):
+                raise FileProcessingError(f"图片文件不存在: {image_data}")
+            return image_data
+
+        # 内存中的图片直接以数组形式交给PaddleOCR，不落临时文件
+        return self._to_ocr_array(self._prepare_image(image_data))
+
+    def _prepare_image(self, image_data: Union[bytes, Image.Image, RawImage]) -> Image.Image:
         """
         准备图片数据
 
         Args:
-            image_data: 字节数据或PIL Image对象
+            image_data: 字节数据、PIL Image对象或RGB像素数据
 
         Returns:
             PIL Image对象
         """
-        if isinstance(image_data, bytes):
+        if isinstance(image_data, RawImage):
+            image = image_data.to_image()
+        elif isinstance(image_data, bytes):
             image = Image.open(io.BytesIO(image_data))
         elif isinstance(image_data, Image.Image):
             image = image_data
@@ -136,40 +217,32 @@ class OCRService:
 
         return image
 
-    def _save_temp_image(self, image: Image.Image) -> str:
+    @staticmethod
+    def _to_ocr_array(image: Image.Image) -> np.ndarray:
         """
-        保存临时图片文件
+        转换为PaddleOCR可直接识别的数组
 
         Args:
-            image: PIL Image对象
+            image: RGB格式的PIL Image对象
 
         Returns:
-            临时文件路径
+            BGR通道顺序的 (H, W, 3) uint8 连续数组
         """
-        temp_dir = tempfile.gettempdir()
-        temp_filename = f"ocr_temp_{uuid.uuid4().hex}.jpg"
-        temp_path = os.path.join(temp_dir, temp_filename)
-
-        try:
-            image.save(temp_path, 'JPEG', quality=95)
-            return temp_path
-        except Exception as e:
-            raise FileProcessingError(f"保存临时图片失败: {e}")
+        rgb = np.asarray(image)
+        if cv2 is not None:
+            # OpenCV的通道交换为向量化实现，直接输出连续内存
+            return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        return np.ascontiguousarray(rgb[:, :, ::-1])
 
     def _extract_text_from_result(self, result: List[Any]) -> str:
-        extracted_text = []
         if not result:
             return ""
 
         # 如果是 predict 返回的 dict 格式
         if isinstance(result[0], dict) and "rec_texts" in result[0]:
-            for res in result:
-                extracted_text.extend(res["rec_texts"])
-        else:
-            # 普通 ocr 返回的 list 格式
-            for line in result[0]:
-                extracted_text.append(line[1][0])
-        return "\n".join(extracted_text)
+            return "\n".join(text for res in result for text in res["rec_texts"])
+        # 普通 ocr 返回的 list 格式
+        return "\n".join(line[1][0] for line in result[0])
 
     def get_service_info(self) -> Dict[str, Any]:
         """
@@ -186,6 +259,20 @@ class OCRService:
         }
 
 
+def get_ocr_service(lang: str = 'ch', use_angle_cls: bool = True) -> OCRService:
+    """
+    获取OCR服务实例，服务对象本身很轻，模型由 _get_ocr 按参数在进程内共享，相同参数只加载一次
+
+    Args:
+        lang: 识别语言
+        use_angle_cls: 是否使用角度分类器
+
+    Returns:
+        OCR服务实例
+    """
+    return OCRService(lang=lang, use_angle_cls=use_angle_cls)
+
+
 class BatchOCRService(OCRService):
     """批量OCR处理服务"""
 
@@ -201,7 +288,7 @@ class BatchOCRService(OCRService):
         super().__init__(lang, use_angle_cls)
         self.max_workers = max_workers
 
-    def process_batch(self, images_data: List[Union[str, bytes, Image.Image]],
+    def process_batch(self, images_data: List[Union[str, bytes, Image.Image, RawImage]],
                       progress_callback: Optional[callable] = None) -> List[Dict[str, Any]]:
         """
         批量处理图片OCR
@@ -213,28 +300,37 @@ class BatchOCRService(OCRService):
         Returns:
             处理结果列表，包含文本和状态信息
         """
-        results = []
         total = len(images_data)
-
-        for i, image_data in enumerate(images_data):
-            try:
-                text = self.recognize_image(image_data)
-                results.append({
-                    'index': i,
-                    'success': True,
-                    'text': text,
-                    'error': None
-                })
-            except Exception as e:
-                results.append({
-                    'index': i,
-                    'success': False,
-                    'text': '',
-                    'error': str(e)
-                })
-
-            # 执行进度回调
-            if progress_callback:
-                progress_callback(i + 1, total)
+        results: List[Optional[Dict[str, Any]]] = [None] * total
+        if not total:
+            return []
+
+        # 多线程让读盘、解码等预处理与推理重叠；推理本身由引擎锁串行执行
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total),
+                                thread_name_prefix='batch-ocr') as executor:
+            futures = {
+                executor.submit(self.recognize_image, image_data): i
+                for i, image_data in enumerate(images_data)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    results[i] = {
+                        'index': i,
+                        'success': True,
+                        'text': future.result(),
+                        'error': None
+                    }
+                except Exception as e:
+                    results[i] = {
+                        'index': i,
+                        'success': False,
+                        'text': '',
+                        'error': str(e)
+                    }
+
+                # 执行进度回调（在调用线程中按完成顺序执行）
+                if progress_callback:
+                    progress_callback(done, total)
 
         return results
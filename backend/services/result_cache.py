@@ -0,0 +1,82 @@
+"""
+OCR结果缓存模块
+按文件内容哈希缓存OCR识别结果，相同文件重复上传时跳过识别
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class OCRResultCache:
+    """OCR结果缓存（进程内LRU，按内容哈希寻址）"""
+
+    READ_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, max_entries: int = 256, ttl: int = 86400):
+        """
+        初始化OCR结果缓存
+
+        Args:
+            max_entries: 最大缓存条目数
+            ttl: 缓存有效期（秒）
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def hash_file(cls, file_path: str) -> str:
+        """
+        计算文件内容哈希
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            十六进制哈希值
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.READ_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        获取缓存的识别结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            识别文本，未命中或已过期时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """
+        写入识别结果
+
+        Args:
+            key: 缓存键
+            value: 识别文本
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
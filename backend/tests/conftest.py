@@ -0,0 +1,33 @@
+"""
+pytest共享夹具
+OCR模型加载耗时较长，整个测试会话只初始化一次服务实例
+"""
+import sys
+import os
+
+import pytest
+
+# 添加父目录到路径以便导入模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import get_ocr_service, PDFProcessor
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture(scope="session")
+def ocr():
+    """会话级OCR服务，PaddleOCR模型只加载一次"""
+    return get_ocr_service(lang='ch', use_angle_cls=True)
+
+
+@pytest.fixture(scope="session")
+def pdf_processor():
+    """会话级PDF处理器"""
+    return PDFProcessor()
+
+
+@pytest.fixture(scope="session")
+def fixtures_dir():
+    """测试数据目录"""
+    return FIXTURES_DIR
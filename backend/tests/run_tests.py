@@ -5,45 +5,116 @@
 """
 import sys
 import os
-import subprocess
+import io
+import argparse
+import logging
+import atexit
+import importlib.util
+import multiprocessing
+import shutil
+import signal
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
 
-def run_test(test_file, description):
-    """运行单个测试文件"""
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+OCR_CACHE_DIR = os.path.join(TEST_DIR, 'fixtures', '.ocr_cache')  # test_ocr_service.py 的识别结果缓存
+TEST_TIMEOUT = 300  # 单个测试超时（秒）
+
+# --isolate 使用的进程池：首次使用时创建，整个运行期间复用
+_POOL = None
+
+class TestTimeout(Exception):
+    """进程内运行的测试超时"""
+
+def _on_timeout(signum, frame):
+    raise TestTimeout()
+
+def run_test_in_process(test_file, description):
+    """
+    在当前解释器中加载测试模块并调用其 main()，返回是否通过
+    省去每个测试的解释器启动和重复导入依赖；须在主线程中依次调用（超时依赖 signal.alarm）
+    """
     print(f"\n{'='*60}")
     print(f"运行测试: {description}")
     print(f"测试文件: {test_file}")
-    print(f"{'='*60}")
+    print(f"{'='*60}", flush=True)
     
+    old_cwd = os.getcwd()
+    old_argv = sys.argv
+    old_handler = signal.signal(signal.SIGALRM, _on_timeout)
     try:
-        # 切换到tests目录
-        test_dir = os.path.dirname(os.path.abspath(__file__))
-        os.chdir(test_dir)
+        # 与脚本方式运行保持一致：工作目录为tests目录，命令行参数只有脚本本身
+        os.chdir(TEST_DIR)
+        sys.argv = [test_file]
+        signal.alarm(TEST_TIMEOUT)
         
-        # 运行测试
-        result = subprocess.run(
-            [sys.executable, test_file],
-            capture_output=False,
-            text=True,
-            timeout=300  # 5分钟超时
-        )
+        module_name = os.path.splitext(test_file)[0]
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(TEST_DIR, test_file))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        try:
+            returncode = module.main() or 0
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
         
-        if result.returncode == 0:
+        if returncode == 0:
             print(f"\n✓ {description} - 测试通过")
             return True
-        else:
-            print(f"\n✗ {description} - 测试失败 (退出码: {result.returncode})")
-            return False
-            
-    except subprocess.TimeoutExpired:
+        print(f"\n✗ {description} - 测试失败 (退出码: {returncode})")
+        return False
+        
+    except TestTimeout:
         print(f"\n✗ {description} - 测试超时")
         return False
     except Exception as e:
         print(f"\n✗ {description} - 测试异常: {e}")
         return False
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, old_handler)
+        sys.argv = old_argv
+        os.chdir(old_cwd)
+        sys.stdout.flush()
+
+def _get_pool(max_workers):
+    """
+    获取复用的测试进程池
+    使用forkserver：工作进程从预先导入公共依赖的服务进程fork而来，
+    既不复制运行器进程的状态，也免去spawn的解释器冷启动
+    """
+    global _POOL
+    if _POOL is None:
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['requests', 'numpy', 'fitz', 'PIL.Image'])
+        _POOL = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        atexit.register(_POOL.shutdown, wait=False)
+    return _POOL
+
+def run_test(test_file, description):
+    """在工作进程中运行单个测试文件，返回 (是否通过, 完整输出)"""
+    # 捕获输出，避免并行测试的输出互相穿插
+    buffer = io.StringIO()
+    with redirect_stdout(buffer), redirect_stderr(buffer):
+        success = run_test_in_process(test_file, description)
+    return success, buffer.getvalue()
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="PaddleDocScan 测试套件")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="运行前删除OCR识别结果缓存，重新执行识别")
+    parser.add_argument('--isolate', action='store_true',
+                        help="在独立的工作进程池中并行运行测试，与运行器进程的状态隔离")
+    args = parser.parse_args()
+    
+    # 默认INFO级别，测试中仅供调试的详细输出（DEBUG）不做格式化
+    logging.basicConfig(level=logging.INFO)
+    
+    if args.no_cache:
+        shutil.rmtree(OCR_CACHE_DIR, ignore_errors=True)
+        print(f"已清除OCR缓存: {OCR_CACHE_DIR}")
+    
     print("PaddleDocScan 测试套件")
     print(f"开始时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
     
@@ -52,18 +123,34 @@ def main():
         ("test_dify_integration.py", "Dify API集成测试"),
         ("test_ai_analysis_api.py", "AI分析API测试"),
         ("test_ocr_service.py", "OCR服务测试"),
+        ("test_ocr_batching.py", "OCR分批识别测试"),
+        ("test_result_cache.py", "OCR结果缓存测试"),
+        ("test_pdf_rendering.py", "PDF渲染测试"),
+        ("test_file_validator.py", "上传文件校验测试"),
+        ("test_thumbnail.py", "缩略图测试"),
     ]
     
-    results = []
+    results = [None] * len(tests)
     
-    for test_file, description in tests:
-        print(f"\n准备运行: {description}")
-        time.sleep(1)
-        
-        success = run_test(test_file, description)
-        results.append((description, success))
-        
-        time.sleep(2)  # 测试间隔
+    if args.isolate:
+        # 各测试相互独立且主要等待网络，并行运行；每个测试结束时整体输出其结果
+        pool = _get_pool(len(tests))
+        futures = {
+            pool.submit(run_test, test_file, description): index
+            for index, (test_file, description) in enumerate(tests)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                success, output = future.result()
+            except Exception as e:
+                success, output = False, f"\n✗ {tests[index][1]} - 工作进程异常: {e}"
+            print(output, flush=True)
+            results[index] = (tests[index][1], success)
+    else:
+        # 默认在当前进程中依次运行，依赖只导入一次
+        for index, (test_file, description) in enumerate(tests):
+            results[index] = (description, run_test_in_process(test_file, description))
     
     # 总结报告
     print(f"\n{'='*60}")
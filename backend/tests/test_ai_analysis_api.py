@@ -5,18 +5,31 @@ AI分析API测试脚本
 """
 import sys
 import os
+import hashlib
 import requests
 import json
 import time
-from typing import Dict, Any
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
 
 # 添加父目录到路径以便导入模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# 错误响应只读取开头这么多字节用于输出
+ERROR_PREVIEW_BYTES = 1024
+
+# 分析类型接口的响应缓存（ETag与响应体），用于条件请求
+ANALYSIS_TYPES_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', '.analysis_types.cache.json')
+
 
 class AIAPITester:
     """AI API测试器"""
     
+    __slots__ = ("base_url", "session", "_analysis_results")
+    
     def __init__(self, base_url: str = "http://localhost:20010"):
         """
         初始化测试器
@@ -26,24 +39,58 @@ class AIAPITester:
         """
         self.base_url = base_url
         self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        # 连接池容纳并发的分析类型请求；网关类5xx错误自动重试
+        adapter = HTTPAdapter(
+            pool_connections=4, pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # (内容摘要, 分析类型) -> 测试结果，相同请求只发送一次
+        self._analysis_results: Dict[Tuple[str, str], bool] = {}
+    
+    def close(self):
+        """关闭会话，释放连接池"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
         
     def test_analysis_types_api(self) -> bool:
         """测试获取分析类型API"""
         print("=== 测试获取分析类型API ===")
         try:
             url = f"{self.base_url}/api/analysis-types"
-            response = self.session.get(url, timeout=10)
+            
+            # 携带上次响应的ETag发起条件请求，内容未变时服务器返回304且不传输响应体
+            cached = self._load_analysis_types_cache(url)
+            headers = {'If-None-Match': cached['etag']} if cached else None
+            response = self.session.get(url, headers=headers, timeout=10)
             
             print(f"状态码: {response.status_code}")
-            print(f"响应内容: {response.text}")
+            if response.status_code == 304 and cached:
+                print("分析类型未变化，使用本地缓存")
+                body = cached['body']
+            elif response.status_code == 200:
+                body = response.text
+                etag = response.headers.get('ETag')
+                if etag:
+                    self._save_analysis_types_cache(url, etag, body)
+            else:
+                print(f"响应内容: {response.text}")
+                return False
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success') and 'data' in data:
-                    print(f"可用的分析类型: {len(data['data'])}个")
-                    for item in data['data']:
-                        print(f"  - {item['id']}: {item['name']} - {item['description']}")
-                    return True
+            print(f"响应内容: {body}")
+            data = json.loads(body)
+            if data.get('success') and 'data' in data:
+                print(f"可用的分析类型: {len(data['data'])}个")
+                for item in data['data']:
+                    print(f"  - {item['id']}: {item['name']} - {item['description']}")
+                return True
             
             return False
             
@@ -51,45 +98,78 @@ class AIAPITester:
             print(f"测试失败: {e}")
             return False
     
+    @staticmethod
+    def _load_analysis_types_cache(url: str) -> Optional[Dict[str, str]]:
+        """读取该地址缓存的分析类型响应（ETag与响应体），无缓存时返回None"""
+        try:
+            with open(ANALYSIS_TYPES_CACHE, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cached if cached.get('url') == url else None
+    
+    @staticmethod
+    def _save_analysis_types_cache(url: str, etag: str, body: str):
+        """原子地写入分析类型响应缓存"""
+        os.makedirs(os.path.dirname(ANALYSIS_TYPES_CACHE), exist_ok=True)
+        tmp_path = f"{ANALYSIS_TYPES_CACHE}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'etag': etag, 'body': body}, f, ensure_ascii=False)
+        os.replace(tmp_path, ANALYSIS_TYPES_CACHE)
+    
     def test_ai_analysis_api(self, content: str, analysis_type: str = "general") -> bool:
-        """测试AI分析API"""
-        print(f"=== 测试AI分析API ({analysis_type}) ===")
+        """测试AI分析API，相同内容和分析类型的结果会被复用"""
+        key = (hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest(), analysis_type)
+        if key not in self._analysis_results:
+            self._analysis_results[key] = self._request_ai_analysis(content, analysis_type)
+        return self._analysis_results[key]
+    
+    def _request_ai_analysis(self, content: str, analysis_type: str) -> bool:
+        """调用AI分析API，输出在请求结束后一次性打印，避免并发时互相穿插"""
+        lines = [f"=== 测试AI分析API ({analysis_type}) ==="]
         try:
             url = f"{self.base_url}/api/ai-analysis"
-            payload = {
+            # 每个 (内容, 分析类型) 只请求一次，请求体用orjson编码后直接发送
+            body = orjson.dumps({
                 "content": content,
                 "analysis_type": analysis_type
-            }
+            })
             
-            print(f"请求URL: {url}")
-            print(f"请求内容长度: {len(content)}")
+            lines.append(f"请求URL: {url}")
+            lines.append(f"请求内容长度: {len(content)}")
             
-            response = self.session.post(
-                url, 
-                json=payload, 
-                headers={'Content-Type': 'application/json'},
-                timeout=60
-            )
+            # 流式请求：收到响应头即可判断状态码，错误响应不必下载完整响应体
+            start_ns = time.perf_counter_ns()
+            with self.session.post(url, data=body, stream=True, timeout=60) as response:
+                header_ms = (time.perf_counter_ns() - start_ns) / 1e6
+                lines.append(f"状态码: {response.status_code}")
+                lines.append(f"首字节时间: {header_ms:.0f}毫秒")
+                
+                if response.status_code != 200:
+                    error_preview = next(response.iter_content(ERROR_PREVIEW_BYTES), b'')
+                    lines.append(f"错误响应: {error_preview.decode('utf-8', errors='replace')}")
+                    return False
+                
+                data = orjson.loads(response.content)
+                total_ms = (time.perf_counter_ns() - start_ns) / 1e6
+                lines.append(f"响应时间: {total_ms / 1000:.2f}秒")
             
-            print(f"状态码: {response.status_code}")
-            print(f"响应时间: {response.elapsed.total_seconds():.2f}秒")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"响应成功: {data.get('success', False)}")
-                if data.get('success') and 'data' in data:
-                    result_data = data['data']
-                    print(f"分析结果长度: {len(str(result_data.get('result', '')))}")
-                    print(f"分析结果预览: {str(result_data.get('result', ''))[:200]}...")
-                    return True
-            else:
-                print(f"错误响应: {response.text}")
+            lines.append(f"响应成功: {data.get('success', False)}")
+            if data.get('success') and 'data' in data:
+                result_data = data['data']
+                lines.append(f"分析结果长度: {len(str(result_data.get('result', '')))}")
+                lines.append(f"分析结果预览: {str(result_data.get('result', ''))[:200]}...")
+                return True
             
             return False
             
         except Exception as e:
-            print(f"测试失败: {e}")
+            lines.append(f"测试失败: {e}")
             return False
+        finally:
+            # 整段输出作为一次写入，print会把正文和换行分两次写，并发时各请求的输出会交错
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
     
     def run_all_tests(self):
         """运行所有测试"""
@@ -115,11 +195,17 @@ class AIAPITester:
         # 2. 测试各种分析类型
         analysis_types = ["general", "summary", "extract", "sentiment"]
         
-        for analysis_type in analysis_types:
-            success = self.test_ai_analysis_api(test_content, analysis_type)
+        # 各分析类型相互独立，并发请求；Session的连接池在线程间共享
+        with ThreadPoolExecutor(max_workers=len(analysis_types)) as executor:
+            results = list(executor.map(
+                lambda analysis_type: self.test_ai_analysis_api(test_content, analysis_type),
+                analysis_types
+            ))
+        
+        print()
+        for analysis_type, success in zip(analysis_types, results):
             print(f"{analysis_type} 分析测试: {'成功' if success else '失败'}")
-            print()
-            time.sleep(1)  # 避免请求过于频繁
+        print()
         
         print("所有测试完成！")
 
@@ -129,8 +215,8 @@ def main():
     # 可以通过命令行参数指定服务器地址
     base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:20010"
     
-    tester = AIAPITester(base_url)
-    tester.run_all_tests()
+    with AIAPITester(base_url) as tester:
+        tester.run_all_tests()
 
 
 if __name__ == "__main__":
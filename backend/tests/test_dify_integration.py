@@ -5,24 +5,82 @@ Dify API集成测试
 """
 import sys
 import os
+import atexit
 import requests
 import json
+import logging
 import time
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 添加父目录到路径以便导入模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+logger = logging.getLogger(__name__)
+
+DIFY_URL = "https://api.dify.ai/v1/workflows/run"
+DIFY_TOKEN = "app-dAUUqBRS185OrvicXgikgb8K"
+
+# 所有请求共用一个会话，复用到Dify的keep-alive连接，避免每次重新握手
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "Authorization": f"Bearer {DIFY_TOKEN}",
+    "Content-Type": "application/json"
+})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1, pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+atexit.register(_SESSION.close)
+
+class LazyStr:
+    """日志参数的延迟求值包装，只有日志真正输出时才执行格式化"""
+    
+    def __init__(self, func):
+        self.func = func
+    
+    def __str__(self):
+        return self.func()
+
+def _pretty_json(obj):
+    """缩进格式的JSON，延迟到调试日志输出时才序列化"""
+    return LazyStr(lambda: orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode())
+
+_LONG_TEXT = "这是一个很长的测试文本。" * 100
+
+# 不同输入格式的测试用例
+_INPUT_CASES = [
+    {
+        "name": "标准文本输入",
+        "inputs": {"rec": "这是一个标准的文本分析测试。"}
+    },
+    {
+        "name": "空输入测试", 
+        "inputs": {"rec": ""}
+    },
+    {
+        "name": "长文本测试",
+        "inputs": {"rec": _LONG_TEXT}
+    }
+]
+
+# 请求体在导入时用orjson编码一次，发送时直接作为字节体
+_INPUT_PAYLOADS = [
+    orjson.dumps({
+        "inputs": test_case["inputs"],
+        "response_mode": "blocking",
+        "user": f"test-user-{i}"
+    })
+    for i, test_case in enumerate(_INPUT_CASES, 1)
+]
+
 def test_dify_api():
     """测试Dify API调用"""
     print("=== 测试Dify工作流API ===")
     
-    url = "https://api.dify.ai/v1/workflows/run"
-    token = "app-dAUUqBRS185OrvicXgikgb8K"
-    
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    url = DIFY_URL
     
     # 按照Dify官方API格式构建请求体
     payload = {
@@ -34,17 +92,16 @@ def test_dify_api():
     }
     
     print(f"请求URL: {url}")
-    print(f"请求头: {json.dumps(headers, indent=2, ensure_ascii=False)}")
-    print(f"请求体: {json.dumps(payload, indent=2, ensure_ascii=False)}")
+    logger.debug("请求头: %s", _pretty_json(dict(_SESSION.headers)))
+    logger.debug("请求体: %s", _pretty_json(payload))
     
     try:
         print("\n发送请求...")
         start_time = time.time()
         
-        response = requests.post(
+        response = _SESSION.post(
             url, 
             json=payload, 
-            headers=headers, 
             timeout=30
         )
         
@@ -52,13 +109,13 @@ def test_dify_api():
         
         print(f"响应时间: {end_time - start_time:.2f}秒")
         print(f"响应状态码: {response.status_code}")
-        print(f"响应头: {dict(response.headers)}")
+        logger.debug("响应头: %s", _pretty_json(dict(response.headers)))
         
         if response.status_code == 200:
             try:
                 result = response.json()
                 print(f"响应成功!")
-                print(f"响应内容: {json.dumps(result, indent=2, ensure_ascii=False)}")
+                logger.debug("响应内容: %s", _pretty_json(result))
                 
                 # 尝试提取结果
                 if "data" in result and "outputs" in result["data"]:
@@ -93,55 +150,33 @@ def test_different_inputs():
     """测试不同的输入参数"""
     print("\n=== 测试不同输入格式 ===")
     
-    # 测试用例
-    test_cases = [
-        {
-            "name": "标准文本输入",
-            "inputs": {"rec": "这是一个标准的文本分析测试。"}
-        },
-        {
-            "name": "空输入测试", 
-            "inputs": {"rec": ""}
-        },
-        {
-            "name": "长文本测试",
-            "inputs": {"rec": "这是一个很长的测试文本。" * 100}
-        }
-    ]
-    
-    url = "https://api.dify.ai/v1/workflows/run"
-    token = "app-dAUUqBRS185OrvicXgikgb8K"
-    
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    url = DIFY_URL
+    test_cases = _INPUT_CASES
     
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\n{i}. {test_case['name']}")
-        
-        payload = {
-            "inputs": test_case["inputs"],
-            "response_mode": "blocking",
-            "user": f"test-user-{i}"
-        }
+    # 并发发送各用例，总耗时约为最慢一次请求的耗时；结果按用例顺序输出
+    with ThreadPoolExecutor(max_workers=len(test_cases)) as executor:
+        futures = [executor.submit(_SESSION.post, url, data=payload, timeout=30)
+                   for payload in _INPUT_PAYLOADS]
         
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
-            print(f"  状态码: {response.status_code}")
+        for i, (test_case, future) in enumerate(zip(test_cases, futures), 1):
+            print(f"\n{i}. {test_case['name']}")
             
-            if response.status_code == 200:
-                print(f"  ✓ 测试通过")
-            else:
-                print(f"  ✗ 测试失败: {response.text[:200]}")
+            try:
+                response = future.result()
+                print(f"  状态码: {response.status_code}")
                 
-        except Exception as e:
-            print(f"  ✗ 请求异常: {e}")
-        
-        time.sleep(1)  # 避免请求过于频繁
+                if response.status_code == 200:
+                    print(f"  ✓ 测试通过")
+                else:
+                    print(f"  ✗ 测试失败: {response.text[:200]}")
+                    
+            except Exception as e:
+                print(f"  ✗ 请求异常: {e}")
 
 def main():
     """主函数"""
+    # 单独运行时默认INFO级别，请求/响应的完整JSON只在DEBUG级别输出
+    logging.basicConfig(level=logging.INFO)
     print("Dify API集成测试开始...")
     print("=" * 50)
     
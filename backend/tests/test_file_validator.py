@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+上传文件校验测试
+测试内存中与已落盘的上传文件的大小获取
+"""
+import sys
+import os
+import io
+import tempfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+# 添加父目录到路径以便导入模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers import FileValidator
+
+SPOOL_MAX_SIZE = 1024
+
+
+def test_file_size_of_in_memory_upload():
+    stream = io.BytesIO(b'x' * 1234)
+    assert FileValidator.get_file_size(FileStorage(stream, 'a.png')) == 1234
+    assert stream.tell() == 0
+
+
+def test_file_size_of_disk_backed_upload():
+    with tempfile.NamedTemporaryFile() as stream:
+        stream.write(b'x' * 5000)
+        stream.seek(10)
+        assert FileValidator.get_file_size(FileStorage(stream, 'a.pdf')) == 5000
+        # 测量后恢复原读取位置
+        assert stream.tell() == 10
+
+
+@pytest.mark.parametrize('size', [SPOOL_MAX_SIZE // 10, SPOOL_MAX_SIZE * 5])
+def test_file_size_of_spooled_upload(size):
+    # 小于max_size时留在内存，超过时转存到磁盘，两种情况都应得到实际大小
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as stream:
+        stream.write(b'x' * size)
+        stream.seek(0)
+        assert FileValidator.get_file_size(FileStorage(stream, 'a.pdf')) == size
+        assert stream.tell() == 0
+
+
+def main():
+    """兼容 run_tests.py 调用，实际由pytest执行"""
+    return pytest.main([os.path.abspath(__file__), "-q"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
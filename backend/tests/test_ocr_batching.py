@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+OCR分批识别测试
+以替身引擎测试 OCRService.recognize_multiple_images 的分批提交与失败回退，无需加载PaddleOCR模型
+"""
+import sys
+import os
+
+import pytest
+from PIL import Image
+
+# 添加父目录到路径以便导入模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import OCRService
+from services import ocr_service
+
+
+class FakeEngine:
+    """按像素值返回识别文本的替身引擎，记录每次调用的输入张数"""
+
+    def __init__(self, fail_pages=()):
+        self.calls = []
+        self.fail_pages = set(fail_pages)
+
+    def ocr(self, ocr_input):
+        inputs = ocr_input if isinstance(ocr_input, list) else [ocr_input]
+        self.calls.append(len(inputs))
+        # 输入为BGR数组，红色通道值即页码
+        pages = [int(arr[0, 0, 2]) for arr in inputs]
+        if len(inputs) > 1 and self.fail_pages.intersection(pages):
+            raise RuntimeError("批量推理失败")
+        return [{"rec_texts": [f"page-{page}"]} for page in pages]
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    """以替身引擎构造OCR服务"""
+    def make(engine):
+        monkeypatch.setattr(ocr_service, '_get_ocr', lambda lang, use_angle_cls: engine)
+        return OCRService()
+    return make
+
+
+def pages(count):
+    return [Image.new('RGB', (2, 2), (i, 0, 0)) for i in range(count)]
+
+
+def test_submits_bounded_batches(make_service):
+    engine = FakeEngine()
+    service = make_service(engine)
+
+    texts = service.recognize_multiple_images(pages(7), batch_size=3)
+
+    assert texts == [f"page-{i}" for i in range(7)]
+    assert engine.calls == [3, 3, 1]
+
+
+def test_fallback_only_for_failed_batch(make_service):
+    engine = FakeEngine(fail_pages={4})
+    service = make_service(engine)
+
+    texts = service.recognize_multiple_images(pages(7), batch_size=3)
+
+    assert texts == [f"page-{i}" for i in range(7)]
+    # 仅第二批(3-5页)回退为逐张识别
+    assert engine.calls == [3, 3, 1, 1, 1, 1]
+
+
+def test_empty_input(make_service):
+    engine = FakeEngine()
+    assert make_service(engine).recognize_multiple_images([]) == []
+    assert engine.calls == []
+
+
+def main():
+    """兼容 run_tests.py 调用，实际由pytest执行"""
+    return pytest.main([os.path.abspath(__file__), "-q"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
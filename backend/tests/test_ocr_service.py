@@ -2,68 +2,150 @@
 """
 OCR服务测试
 测试图片和PDF文档的OCR识别功能
+
+运行方式: pytest -q test_ocr_service.py（服务实例由 conftest.py 中的会话级夹具提供）
 """
 import sys
 import os
+import json
+import glob
+import hashlib
+import functools
+import importlib.metadata
+import queue
+import threading
+
+import pytest
 
 # 添加父目录到路径以便导入模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services import (
-    OCRService, PDFProcessor, ImageProcessor, PreviewGenerator,
-    FileManager, FileProcessor, OCRError, FileProcessingError,
-    UnsupportedFileError, FileSizeError, ValidationError
-)
+from services import FileProcessor
 
-Test_OCR_Server = OCRService(lang='ch', use_angle_cls=True)
-pdf_processor = PDFProcessor()
+# 识别结果按样本文件内容与被测代码版本的SHA-256缓存到磁盘，样本和代码都不变时后续运行直接读取
+# 删除该目录（或运行 run_tests.py --no-cache）即可失效
+OCR_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', '.ocr_cache')
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services')
 
-def test_ocr_image():
-    """测试图片OCR识别"""
-    image_path = './fixtures/sample_image.png'
+@functools.cache
+def code_digest():
+    """
+    被测代码的版本摘要：services/*.py、本测试文件及PaddleOCR版本
+    任一变化都会使缓存失效，修改识别或渲染代码后测试会重新执行识别
+    """
+    h = hashlib.sha256()
+    paths = sorted(glob.glob(os.path.join(SERVICES_DIR, '*.py'))) + [os.path.abspath(__file__)]
+    for path in paths:
+        h.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            h.update(hashlib.file_digest(f, 'sha256').digest())
     try:
-        img_txt = Test_OCR_Server.recognize_image(image_path)
-        print(f"图片OCR结果: {img_txt}")
-        return img_txt
-    except Exception as e:
-        print(f"图片OCR测试失败: {e}")
-        return None
+        h.update(importlib.metadata.version('paddleocr').encode('utf-8'))
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    return h.hexdigest()
 
-def test_pdf_processing():
-    """测试PDF文档处理"""
-    pdf_path = './fixtures/sample_document.pdf'
+def cached_ocr(file_path, recognize):
+    """
+    读取样本文件的缓存识别结果，未命中时执行识别并写入缓存
+    
+    Args:
+        file_path: 样本文件路径
+        recognize: 无参数的识别函数，返回识别文本
+        
+    Returns:
+        识别文本
+    """
+    with open(file_path, 'rb') as f:
+        h = hashlib.file_digest(f, 'sha256')
+    h.update(code_digest().encode('ascii'))
+    cache_path = os.path.join(OCR_CACHE_DIR, f"{h.hexdigest()}.json")
+    
     try:
-        # 获取文件类型
-        file_type = FileProcessor.get_file_extension(pdf_path)
-        if file_type == 'pdf':
-            # 处理PDF文件
-            images_data = pdf_processor.convert_to_images(pdf_path)
-            if not images_data:
-                raise FileProcessingError("PDF文件转换失败，没有生成图片")
-            
-            print(f"PDF转换成功，生成了{len(images_data)}张图片")
-            
-            # 对第一张图片进行OCR
-            if images_data:
-                first_image = images_data[0]
-                ocr_result = Test_OCR_Server.recognize_from_bytes(first_image['image_data'])
-                print(f"PDF第一页OCR结果: {ocr_result}")
-                return ocr_result
-                
-    except Exception as e:
-        print(f"PDF处理测试失败: {e}")
-        return None
+        with open(cache_path, encoding='utf-8') as f:
+            print(f"使用缓存的识别结果: {cache_path}")
+            return json.load(f)['text']
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    text = recognize()
+    os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({'file': os.path.basename(file_path), 'text': text}, f, ensure_ascii=False)
+    return text
 
-if __name__ == "__main__":
-    print("=== OCR服务测试 ===")
+# PDF各页按此页数分批提交批量识别
+OCR_BATCH_PAGES = 4
+
+def prefetch(iterable, maxsize=2):
+    """
+    在后台线程中提前取出迭代器的元素，队列有界，最多预取 maxsize 个
     
-    # 切换到tests目录
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    Args:
+        iterable: 源迭代器（如逐页渲染的生成器）
+        maxsize: 预取队列容量
+        
+    Yields:
+        源迭代器的元素，顺序不变；源迭代器抛出的异常在取到该位置时重新抛出
+    """
+    done = object()
+    items = queue.Queue(maxsize=maxsize)
     
-    print("\n1. 测试图片OCR识别...")
-    test_ocr_image()
+    def produce():
+        try:
+            for item in iterable:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        else:
+            items.put(done)
     
-    print("\n2. 测试PDF文档处理...")
-    test_pdf_processing()
+    threading.Thread(target=produce, daemon=True).start()
+    while (item := items.get()) is not done:
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def test_ocr_image(ocr, fixtures_dir):
+    """测试图片OCR识别"""
+    image_path = os.path.join(fixtures_dir, 'sample_image.png')
+    img_txt = cached_ocr(image_path, lambda: ocr.recognize_image(image_path))
+    print(f"图片OCR结果: {img_txt}")
+    
+    assert isinstance(img_txt, str)
+    assert img_txt.strip(), "图片OCR未识别出文本"
+
+def test_pdf_processing(ocr, pdf_processor, fixtures_dir):
+    """测试PDF文档处理"""
+    pdf_path = os.path.join(fixtures_dir, 'sample_document.pdf')
+    assert FileProcessor.get_file_extension(pdf_path) == 'pdf'
+    
+    def recognize_pages():
+        # 逐页渲染与识别流水线执行：渲染线程准备后续页面的同时，
+        # 每凑满 OCR_BATCH_PAGES 页提交一次批量识别
+        texts = []
+        batch = []
+        for page in prefetch(pdf_processor.iter_pages(pdf_path), maxsize=OCR_BATCH_PAGES):
+            batch.append(page)
+            if len(batch) == OCR_BATCH_PAGES:
+                texts.extend(ocr.recognize_multiple_images(batch))
+                batch = []
+        if batch:
+            texts.extend(ocr.recognize_multiple_images(batch))
+        assert texts, "PDF文件转换失败，没有生成图片"
+        
+        print(f"PDF转换成功，识别了{len(texts)}页")
+        return "\n".join(texts)
     
-    print("\n测试完成！")
+    ocr_result = cached_ocr(pdf_path, recognize_pages)
+    print(f"PDF OCR结果: {ocr_result}")
+    
+    assert isinstance(ocr_result, str)
+    assert ocr_result.strip(), "PDF未识别出文本"
+
+def main():
+    """兼容 run_tests.py 调用，实际由pytest执行并共享夹具"""
+    return pytest.main([os.path.abspath(__file__), "-q", "-s"])
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,11 +5,7 @@ PDFProcessor 测试模块
 """
 import sys
 import os
-import unittest
-from hashlib import file_digest
-from unittest.mock import patch, Mock, MagicMock
-import tempfile
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 
 # 配置日志
@@ -26,10 +22,13 @@ from services.exceptions import FileProcessingError
 def save_images(images_data, output_dir="./fixtures/output_images"):
     os.makedirs(output_dir, exist_ok=True)  # 创建输出目录
 
-    for idx, img_bytes in enumerate(images_data, start=1):
+    def save(idx, raw_image):
         filename = os.path.join(output_dir, f"image_{idx}.png")
-        with open(filename, "wb") as f:
-            f.write(img_bytes)
+        raw_image.to_image().save(filename)
+
+    # PNG编码和写盘期间释放GIL，多线程并行保存各页
+    with ThreadPoolExecutor(max_workers=min(8, len(images_data) or 1)) as executor:
+        list(executor.map(save, range(1, len(images_data) + 1), images_data))
 
     print(f"保存完成，共保存 {len(images_data)} 张图片到 {output_dir}/")
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+PDF渲染测试
+测试并行渲染与逐页渲染的页序及尺寸上限
+"""
+import sys
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+# 添加父目录到路径以便导入模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import PDFProcessor
+
+PAGE_COUNT = 7
+
+
+@pytest.fixture
+def numbered_pdf(tmp_path):
+    """每页宽度不同的PDF，渲染结果的宽度即可标识页码"""
+    pdf_path = tmp_path / 'numbered.pdf'
+    with fitz.open() as doc:
+        for i in range(PAGE_COUNT):
+            doc.new_page(width=100 + 20 * i, height=400)
+        doc.save(str(pdf_path))
+    return str(pdf_path)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def render_pool():
+    """测试结束后关闭渲染进程池，避免遗留子进程阻塞运行测试的进程退出"""
+    yield
+    PDFProcessor.shutdown_render_pool()
+
+
+def _page_widths(images):
+    return [image.width for image in images]
+
+
+def test_parallel_render_keeps_page_order(numbered_pdf):
+    expected = [100 + 20 * i for i in range(PAGE_COUNT)]
+
+    sequential = PDFProcessor(render_workers=0).convert_to_images(numbered_pdf, dpi=72, max_long_edge=0)
+    parallel = PDFProcessor(render_workers=3).convert_to_images(numbered_pdf, dpi=72, max_long_edge=0)
+
+    assert _page_widths(sequential) == expected
+    assert _page_widths(parallel) == expected
+    assert [image.data for image in parallel] == [image.data for image in sequential]
+
+
+def test_iter_pages_matches_convert_to_images(numbered_pdf):
+    processor = PDFProcessor()
+    assert list(processor.iter_pages(numbered_pdf, dpi=72)) == processor.convert_to_images(numbered_pdf, dpi=72)
+
+
+def test_max_long_edge_caps_rendered_size(numbered_pdf):
+    images = PDFProcessor().convert_to_images(numbered_pdf, dpi=200, max_long_edge=300)
+    assert all(max(image.width, image.height) <= 300 for image in images)
+
+
+def main():
+    """兼容 run_tests.py 调用，实际由pytest执行"""
+    return pytest.main([os.path.abspath(__file__), "-q"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+OCR结果缓存测试
+测试 OCRResultCache 的LRU淘汰与过期行为
+"""
+import sys
+import os
+
+import pytest
+
+# 添加父目录到路径以便导入模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import OCRResultCache
+from services import result_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的单调时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_get_returns_cached_value(clock):
+    cache = OCRResultCache(max_entries=2, ttl=60)
+    cache.set('a', 'text-a')
+    assert cache.get('a') == 'text-a'
+    assert cache.get('missing') is None
+
+
+def test_evicts_least_recently_used(clock):
+    cache = OCRResultCache(max_entries=2, ttl=60)
+    cache.set('a', 'text-a')
+    cache.set('b', 'text-b')
+    # 访问a后，b成为最久未使用的条目
+    assert cache.get('a') == 'text-a'
+    cache.set('c', 'text-c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'text-a'
+    assert cache.get('c') == 'text-c'
+
+
+def test_overwrite_refreshes_entry(clock):
+    cache = OCRResultCache(max_entries=2, ttl=60)
+    cache.set('a', 'old')
+    cache.set('b', 'text-b')
+    cache.set('a', 'new')
+    cache.set('c', 'text-c')
+
+    assert cache.get('a') == 'new'
+    assert cache.get('b') is None
+
+
+def test_expired_entry_is_dropped(clock):
+    cache = OCRResultCache(max_entries=2, ttl=60)
+    cache.set('a', 'text-a')
+
+    clock[0] += 59
+    assert cache.get('a') == 'text-a'
+
+    clock[0] += 2
+    assert cache.get('a') is None
+    # 过期条目在读取时被移除，不再占用容量
+    assert 'a' not in cache._entries
+
+
+def test_hash_file_depends_on_content(tmp_path):
+    first = tmp_path / 'first.bin'
+    second = tmp_path / 'second.bin'
+    first.write_bytes(b'x' * (OCRResultCache.READ_CHUNK_SIZE + 1))
+    second.write_bytes(b'x' * (OCRResultCache.READ_CHUNK_SIZE + 1))
+    assert OCRResultCache.hash_file(str(first)) == OCRResultCache.hash_file(str(second))
+
+    second.write_bytes(b'y')
+    assert OCRResultCache.hash_file(str(first)) != OCRResultCache.hash_file(str(second))
+
+
+def main():
+    """兼容 run_tests.py 调用，实际由pytest执行"""
+    return pytest.main([os.path.abspath(__file__), "-q"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
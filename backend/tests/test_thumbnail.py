@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+缩略图测试
+测试JPEG缩放解码因子的选择与缩略图尺寸
+"""
+import sys
+import os
+import io
+import base64
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# 添加父目录到路径以便导入模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import PreviewGenerator
+from services import file_processor
+
+# libjpeg-turbo 提供的缩放因子（包含大于1的放大因子）
+TURBOJPEG_SCALING_FACTORS = frozenset({
+    (2, 1), (15, 8), (7, 4), (13, 8), (3, 2), (11, 8), (5, 4), (9, 8),
+    (1, 1), (7, 8), (3, 4), (5, 8), (1, 2), (3, 8), (1, 4), (1, 8),
+})
+
+
+class FakeTurboJPEG:
+    """按所选缩放因子返回对应尺寸像素的解码器替身，记录使用的因子"""
+
+    scaling_factors = TURBOJPEG_SCALING_FACTORS
+
+    def __init__(self):
+        self.factor = None
+
+    def decode_header(self, data):
+        image = Image.open(io.BytesIO(data))
+        return image.width, image.height, 0, 0
+
+    def decode(self, data, pixel_format, scaling_factor):
+        self.factor = scaling_factor
+        width, height, _, _ = self.decode_header(data)
+        num, denom = scaling_factor
+        return np.zeros((-(-height * num // denom), -(-width * num // denom), 3), dtype=np.uint8)
+
+
+def _jpeg_bytes(size):
+    output = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(output, format='JPEG')
+    return output.getvalue()
+
+
+def _thumbnail_size(encoded):
+    return Image.open(io.BytesIO(base64.b64decode(encoded))).size
+
+
+@pytest.fixture
+def fake_decoder(monkeypatch):
+    decoder = FakeTurboJPEG()
+    monkeypatch.setattr(file_processor, 'turbojpeg_decoder', decoder)
+    monkeypatch.setattr(file_processor, 'turbojpeg', SimpleNamespace(TJPF_RGB=0))
+    return decoder
+
+
+def test_large_jpeg_uses_smallest_sufficient_factor(fake_decoder):
+    image = file_processor._fast_decode_scaled(_jpeg_bytes((2400, 1600)), (300, 300))
+    assert fake_decoder.factor == (1, 8)
+    assert image.size == (300, 200)
+
+
+def test_small_jpeg_is_not_upscaled(fake_decoder):
+    image = file_processor._fast_decode_scaled(_jpeg_bytes((200, 200)), (300, 300))
+    assert fake_decoder.factor == (1, 1)
+    assert image.size == (200, 200)
+
+
+@pytest.mark.parametrize('size, expected', [((200, 200), (200, 200)), ((1200, 600), (300, 150))])
+def test_thumbnail_size_with_turbojpeg(fake_decoder, size, expected):
+    assert _thumbnail_size(PreviewGenerator().generate_thumbnail(_jpeg_bytes(size))) == expected
+
+
+@pytest.mark.parametrize('size, expected', [((200, 200), (200, 200)), ((1200, 600), (300, 150))])
+def test_thumbnail_size_with_pil(monkeypatch, size, expected):
+    monkeypatch.setattr(file_processor, 'turbojpeg_decoder', None)
+    assert _thumbnail_size(PreviewGenerator().generate_thumbnail(_jpeg_bytes(size))) == expected
+
+
+def main():
+    """兼容 run_tests.py 调用，实际由pytest执行"""
+    return pytest.main([os.path.abspath(__file__), "-q"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
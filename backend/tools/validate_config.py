@@ -0,0 +1,94 @@
+"""
+配置静态校验脚本
+在提交前检查 config.py 中各环境配置类的不变量，配置错误在提交阶段暴露而不是在服务启动时
+
+使用方式: python backend/tools/validate_config.py
+"""
+import logging
+import os
+import sys
+from typing import List
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from config import config  # noqa: E402
+except ValueError as e:
+    # 环境变量类型转换失败时输出可读的错误信息而不是异常堆栈
+    sys.exit(f"配置加载失败: {e}")
+
+LOG_LEVELS = {'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'}
+
+
+def validate_config_class(name: str, cls) -> List[str]:
+    """
+    校验单个配置类
+
+    Args:
+        name: 配置名称
+        cls: 配置类
+
+    Returns:
+        错误信息列表
+    """
+    errors = []
+
+    if cls.LOG_LEVEL.upper() not in LOG_LEVELS:
+        errors.append(f"{name}: 无效的日志级别 {cls.LOG_LEVEL}")
+
+    for attr in ('MAX_CONTENT_LENGTH', 'OCR_MAX_WORKERS', 'OCR_BATCH_PAGES', 'AI_MAX_WORKERS', 'UPLOAD_SPOOL_SIZE'):
+        if getattr(cls, attr) <= 0:
+            errors.append(f"{name}: {attr} 必须大于0")
+
+    for attr in ('OCR_CACHE_MAX_ENTRIES', 'OCR_CACHE_TTL', 'STATIC_MAX_AGE', 'CORS_MAX_AGE',
+                 'PDF_RENDER_WORKERS'):
+        if getattr(cls, attr) < 0:
+            errors.append(f"{name}: {attr} 不能为负数")
+
+    if not cls.ALLOWED_EXTENSIONS:
+        errors.append(f"{name}: ALLOWED_EXTENSIONS 不能为空")
+
+    for model_id, model_config in cls.DIFY_MODELS.items():
+        missing = {'id', 'name', 'description', 'url', 'token'} - model_config.keys()
+        if missing:
+            errors.append(f"{name}: Dify模型 {model_id} 缺少字段 {sorted(missing)}")
+            continue
+        if model_config['id'] != model_id:
+            errors.append(f"{name}: Dify模型键 {model_id} 与id {model_config['id']} 不一致")
+        if urlparse(model_config['url']).scheme not in ('http', 'https'):
+            errors.append(f"{name}: Dify模型 {model_id} 的url无效")
+
+    if cls.DIFY_MODEL_IDS != frozenset(cls.DIFY_MODELS):
+        errors.append(f"{name}: DIFY_MODEL_IDS 与 DIFY_MODELS 不一致")
+
+    return errors
+
+
+def main() -> int:
+    """校验全部配置类，返回进程退出码"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logger = logging.getLogger('validate_config')
+
+    errors = []
+    for name, cls in config.items():
+        errors.extend(validate_config_class(name, cls))
+
+    if config['production'].DEBUG:
+        errors.append("production: DEBUG 必须关闭")
+
+    # 提交阶段通常没有生产环境变量，缺少SECRET_KEY只提示，生产启动时由 init_app 强制检查
+    if not os.environ.get('SECRET_KEY'):
+        logger.warning("production: 未设置 SECRET_KEY 环境变量，生产环境启动时将失败")
+
+    for error in errors:
+        logger.error(error)
+    if errors:
+        return 1
+
+    logger.info("配置校验通过: %s", ', '.join(config))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())